@@ -113,6 +113,38 @@ def main():
                 with engine.connect() as conn:
                     result = conn.execute(text("SELECT 1"))
                     st.success("🟢 Database Online", icon="✅")
+                
+                pool_stats = db.get_pool_stats()
+                if pool_stats:
+                    with st.expander("Connection Pool"):
+                        st.caption(
+                            f"In use: {pool_stats['checked_out']} · "
+                            f"Idle: {pool_stats['checked_in']} · "
+                            f"Overflow: {pool_stats['overflow']}"
+                        )
+                        st.caption(
+                            f"Checkout wait: {pool_stats['avg_wait_ms']} ms avg, "
+                            f"{pool_stats['max_wait_ms']} ms max"
+                        )
+                        last_write = db.get_write_stats().get('upsert_observations')
+                        if last_write:
+                            st.caption(
+                                f"Last observation write: {last_write['rows']} rows via "
+                                f"{last_write['method']} ({last_write['rows_per_sec']:,} rows/sec)"
+                            )
+                        replica = db.get_replica_status()
+                        if replica:
+                            if replica['ready'] and replica['last_sync']:
+                                st.caption(
+                                    f"Local replica: {replica['observations']:,} observations, "
+                                    f"synced {replica['last_sync']:%H:%M:%S}"
+                                )
+                            elif replica['ready']:
+                                st.caption(f"Local replica: {replica['observations']:,} observations")
+                            else:
+                                st.caption("Local replica: initial sync in progress")
+                            if replica['error']:
+                                st.caption(f"Replica sync error: {replica['error']}")
             else:
                 st.error("🔴 Database Offline", icon="❌")
         except Exception as e:
@@ -140,7 +172,7 @@ def main():
         # Quick stats in sidebar
         students_df = db.load_students()
         classes_df = db.load_classes()
-        observations_df = db.load_observations()
+        observation_count = db.count_observations()
         
         st.markdown("### 📊 Quick Stats")
         
@@ -150,7 +182,7 @@ def main():
         with col2:
             st.metric("Classes", len(classes_df))
         
-        st.metric("Total Observations", len(observations_df))
+        st.metric("Total Observations", observation_count)
         
         st.markdown("---")
 
@@ -1,23 +1,278 @@
 import database as db
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime, timedelta
+import argparse
+import glob
+import json
 import os
 
+BACKUP_DIR = 'backups'
+
+# Parquet snapshots: <table>/<run_id>.parquet for rosters and
+# observations/month=YYYY-MM/<run_id>.parquet, listed in manifest.json
+PARQUET_DIR = os.path.join(BACKUP_DIR, 'parquet')
+MANIFEST_FILE = 'manifest.json'
+
+# Incremental runs re-read this much before the watermark so rows committed by
+# transactions still open at the last backup are not missed (restore dedupes)
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+OBSERVATION_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('class_code', pa.string()),
+    ('student_id', pa.string()),
+    ('measure_name', pa.string()),
+    ('value', pa.string()),
+    ('created_at', pa.timestamp('us'))
+])
+
+
 def daily_backup():
-    """Export all data to timestamped CSV files"""
+    """Export all data to timestamped, gzip-compressed CSV files"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    os.makedirs(BACKUP_DIR, exist_ok=True)
     
-    # Load all data
-    students = db.load_students()
-    classes = db.load_classes()
-    observations = db.load_observations()
-    
-    # Save to timestamped files
-    students.to_csv(f'backups/students_{timestamp}.csv', index=False)
-    classes.to_csv(f'backups/classes_{timestamp}.csv', index=False)
-    observations.to_csv(f'backups/observations_{timestamp}.csv', index=False)
+    # Stream each table straight to disk (memory stays bounded for large tables)
+    for table_name in ['students', 'classes', 'observations']:
+        path = os.path.join(BACKUP_DIR, f'{table_name}_{timestamp}.csv.gz')
+        with open(path, 'wb') as backup_file:
+            rows = db.export_table_csv_gz(table_name, backup_file)
+        
+        if rows is None:
+            print(f"❌ Backup of {table_name} failed")
+            return
+        print(f"  {table_name}: {rows} rows")
     
     print(f"✅ Backup created: {timestamp}")
 
+
+def _load_manifest(root):
+    """Read the list of snapshot runs (empty if there are none yet)"""
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'runs': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(root, manifest):
+    """Write the manifest atomically so an interrupted run never corrupts it"""
+    path = os.path.join(root, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _write_observation_partitions(batches, root, run_id):
+    """
+    Write observation chunks into month partitions, one Parquet file per month
+    
+    Chunks arrive ordered by date, so each month's writer is closed as soon as
+    a later month starts and only one chunk is held in memory.
+    
+    Returns:
+        tuple: (rows written, latest created_at or None)
+    """
+    writers = {}
+    rows = 0
+    watermark = None
+    
+    try:
+        for df in batches:
+            months = df['date'].dt.strftime('%Y-%m')
+            for month, part in df.groupby(months, sort=True):
+                if month not in writers:
+                    month_dir = os.path.join(root, 'observations', f'month={month}')
+                    os.makedirs(month_dir, exist_ok=True)
+                    writers[month] = pq.ParquetWriter(
+                        os.path.join(month_dir, f'{run_id}.parquet'),
+                        OBSERVATION_SCHEMA,
+                        compression='zstd'
+                    )
+                part = part.assign(date=part['date'].dt.date)
+                writers[month].write_table(
+                    pa.Table.from_pandas(part, schema=OBSERVATION_SCHEMA, preserve_index=False)
+                )
+            
+            rows += len(df)
+            latest = df['created_at'].max()
+            if pd.notna(latest) and (watermark is None or latest > watermark):
+                watermark = latest
+            
+            # Earlier months are complete once the chunk has moved past them
+            for month in [m for m in writers if m < months.iloc[-1]]:
+                writers.pop(month).close()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    
+    return rows, watermark
+
+
+def _remove_run_files(root, run_id):
+    """Delete every file a failed run wrote, so no orphan partitions are left behind"""
+    for path in glob.glob(os.path.join(root, '**', f'{run_id}.parquet'), recursive=True):
+        os.remove(path)
+
+
+def parquet_backup(incremental=True, root=PARQUET_DIR):
+    """
+    Snapshot data to Parquet, partitioning observations by month
+    
+    Full runs export every observation. Incremental runs only export
+    observations whose created_at is after the previous run's watermark
+    (minus WATERMARK_OVERLAP), so they grow with new data rather than
+    history. Students and classes are small and are always written in full.
+    Deletions are only captured by full runs.
+    
+    The run is only added to the manifest once every file is written. Nothing
+    is written without a database or with an empty roster, and a run that
+    fails part way has its files removed, so the manifest never lists a
+    partial snapshot.
+    
+    Args:
+        incremental: Export only changes since the last run (falls back to a
+            full run when there is none)
+        root: Snapshot directory
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest = _load_manifest(root)
+    previous = manifest['runs'][-1] if manifest['runs'] else None
+    
+    mode = 'incremental' if incremental and previous else 'full'
+    since = None
+    if mode == 'incremental' and previous.get('watermark'):
+        since = datetime.fromisoformat(previous['watermark']) - WATERMARK_OVERLAP
+    
+    started = datetime.now()
+    run_id = f"{mode}-{started.strftime('%Y%m%d_%H%M%S_%f')}"
+    
+    if not db.get_database_connection():
+        print("❌ Parquet backup failed - check the database connection")
+        return
+    
+    # The loaders return an empty DataFrame on error, which must not become the
+    # latest roster snapshot
+    rosters = {'students': db.load_students(), 'classes': db.load_classes()}
+    empty = [table_name for table_name, df in rosters.items() if len(df) == 0]
+    if empty:
+        print(f"❌ Parquet backup aborted - no {' or '.join(empty)} loaded")
+        return
+    
+    try:
+        rows, watermark = _write_observation_partitions(db.stream_observations(since=since), root, run_id)
+        
+        # Rosters in full, only once the observations are safely written
+        for table_name, df in rosters.items():
+            os.makedirs(os.path.join(root, table_name), exist_ok=True)
+            df.to_parquet(os.path.join(root, table_name, f'{run_id}.parquet'), index=False)
+    
+    except Exception as e:
+        _remove_run_files(root, run_id)
+        print(f"❌ Parquet backup {run_id} failed: {str(e)}")
+        return
+    
+    # Keep the previous watermark when nothing new was exported
+    if watermark is None and previous:
+        watermark_text = previous.get('watermark')
+    else:
+        watermark_text = watermark.isoformat() if watermark is not None else None
+    
+    manifest['runs'].append({
+        'run_id': run_id,
+        'mode': mode,
+        'started': started.isoformat(),
+        'since': since.isoformat() if since else None,
+        'watermark': watermark_text,
+        'rows': rows
+    })
+    _save_manifest(root, manifest)
+    
+    print(f"✅ {mode.capitalize()} Parquet backup {run_id}: {rows} observations")
+
+
+def restore_backup(root=PARQUET_DIR, apply=False):
+    """
+    Reassemble the latest full snapshot plus later incremental runs
+    
+    Each month partition is read on its own, and repeated keys keep the row
+    with the latest created_at. With apply=True the database is made to match
+    the snapshot: rosters go through save_students and save_classes, and the
+    observations replace every stored observation in one save_observations
+    transaction, so rows written or kept after the snapshot do not survive.
+    
+    Args:
+        root: Snapshot directory
+        apply: Write the restored data to the database (otherwise a dry run)
+    
+    Returns:
+        dict with students, classes and observations counts, or None
+    """
+    runs = _load_manifest(root)['runs']
+    full_runs = [i for i, run in enumerate(runs) if run['mode'] == 'full']
+    if not full_runs:
+        print("❌ No full Parquet backup found")
+        return None
+    
+    run_ids = [run['run_id'] for run in runs[full_runs[-1]:]]
+    latest = run_ids[-1]
+    
+    students = pd.read_parquet(os.path.join(root, 'students', f'{latest}.parquet'))
+    classes = pd.read_parquet(os.path.join(root, 'classes', f'{latest}.parquet'))
+    if apply and (len(students) == 0 or len(classes) == 0):
+        print(f"❌ Backup {latest} has an empty roster - refusing to restore over the current data")
+        return None
+    
+    observation_count = 0
+    restored = []
+    observations_dir = os.path.join(root, 'observations')
+    months = sorted(os.listdir(observations_dir)) if os.path.exists(observations_dir) else []
+    
+    for month in months:
+        paths = [
+            os.path.join(observations_dir, month, f'{run_id}.parquet') for run_id in run_ids
+            if os.path.exists(os.path.join(observations_dir, month, f'{run_id}.parquet'))
+        ]
+        if not paths:
+            continue
+        
+        month_df = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        month_df = month_df.sort_values('created_at', kind='stable')
+        month_df = month_df.drop_duplicates(subset=db.OBSERVATION_KEY, keep='last')
+        observation_count += len(month_df)
+        
+        if apply:
+            restored.append(month_df[db.OBSERVATION_COLUMNS])
+        print(f"  {month}: {len(month_df)} observations from {len(paths)} file(s)")
+    
+    if apply:
+        observations = (pd.concat(restored, ignore_index=True) if restored
+                        else pd.DataFrame(columns=db.OBSERVATION_COLUMNS))
+        if not db.save_observations(observations):
+            print("❌ Restoring observations failed - the database still holds its previous data")
+            return None
+        if not (db.save_classes(classes) and db.save_students(students)):
+            print("❌ Restoring the rosters failed - run the restore again")
+            return None
+    
+    action = "Restored" if apply else "Dry run - would restore"
+    print(f"✅ {action} {len(students)} students, {len(classes)} classes, "
+          f"{observation_count} observations from {len(run_ids)} run(s)")
+    return {'students': len(students), 'classes': len(classes), 'observations': observation_count}
+
 if __name__ == "__main__":
-    daily_backup()
+    parser = argparse.ArgumentParser(description="Back up or restore engagement tracker data")
+    parser.add_argument('--full', action='store_true', help="Full Parquet snapshot instead of incremental")
+    parser.add_argument('--csv', action='store_true', help="Full gzip CSV export instead of Parquet")
+    parser.add_argument('--restore', action='store_true', help="Reassemble the Parquet snapshots")
+    parser.add_argument('--apply', action='store_true', help="With --restore, replace the database contents with the snapshot")
+    args = parser.parse_args()
+    
+    if args.restore:
+        restore_backup(apply=args.apply)
+    elif args.csv:
+        daily_backup()
+    else:
+        parquet_backup(incremental=not args.full)
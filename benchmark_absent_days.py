@@ -0,0 +1,70 @@
+"""
+Benchmark utils.get_absent_days against the old per-date loop
+Generates a reproducible sample (fixed seed), checks both give the same counts and prints timings
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+STUDENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+DAYS = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+MEASURES = utils.ENGAGEMENT_MEASURES[:5]
+REPEATS = 5
+
+
+def loop_days_absent(observations_df, student_id):
+    """The per-date loop get_absent_days replaced"""
+    student_obs = observations_df[observations_df['student_id'] == student_id]
+    
+    absent_days = 0
+    for date in student_obs['date'].unique():
+        date_obs = student_obs[student_obs['date'] == date]
+        if all(date_obs['value'] == '0'):
+            absent_days += 1
+    
+    return absent_days
+
+
+def best_of(function, repeat=REPEATS):
+    """Best wall time in milliseconds over repeat runs"""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+rng = np.random.default_rng(42)
+student_ids = [f"S{i:04d}" for i in range(STUDENTS)]
+dates = pd.date_range('2024-09-01', periods=DAYS, freq='D')
+
+# One row per student, date and measure; about 10% of days are absences (all '0')
+index = pd.MultiIndex.from_product([student_ids, dates, MEASURES], names=['student_id', 'date', 'measure_name'])
+observations = index.to_frame(index=False)
+observations['class_code'] = 'HIS20A'
+values = rng.choice(['1', '0', '-'], size=len(observations), p=[0.6, 0.3, 0.1])
+absent = rng.random((STUDENTS, DAYS)) < 0.1
+values[np.repeat(absent.ravel(), len(MEASURES))] = '0'
+observations['value'] = values
+
+print(f"Sample: {STUDENTS} students x {DAYS} days x {len(MEASURES)} measures = {len(observations)} rows")
+
+# Both implementations must agree for every student before timings mean anything
+grouped = utils.get_absent_days(observations).groupby(level=0).sum()
+mismatched = [sid for sid in student_ids if loop_days_absent(observations, sid) != grouped.get(sid, 0)]
+
+if mismatched:
+    print(f"❌ Counts differ for {len(mismatched)} students: {', '.join(mismatched[:10])}")
+    sys.exit(1)
+
+print(f"✅ Counts match for all {STUDENTS} students ({int(grouped.sum())} absent days)")
+
+student_id = student_ids[0]
+loop_ms = best_of(lambda: loop_days_absent(observations, student_id))
+single_ms = best_of(lambda: utils.get_days_absent(observations, student_id))
+all_loop_ms = best_of(lambda: [loop_days_absent(observations, sid) for sid in student_ids], repeat=1)
+all_grouped_ms = best_of(lambda: utils.get_absent_days(observations).groupby(level=0).sum())
+
+print(f"One student:  loop {loop_ms:8.1f} ms   get_days_absent {single_ms:8.1f} ms   ({loop_ms / single_ms:.0f}x)")
+print(f"All students: loop {all_loop_ms:8.1f} ms   get_absent_days {all_grouped_ms:8.1f} ms   ({all_loop_ms / all_grouped_ms:.0f}x)")
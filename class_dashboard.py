@@ -18,7 +18,6 @@ def render():
     # Load data
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
     
     # Check if data exists
     if len(classes_df) == 0:
@@ -42,8 +41,13 @@ def render():
     st.markdown("---")
     st.header(f"{class_info['class_name']}")
     
+    # Per-student counts for the class roster, aggregated in the database
+    class_students = students_df[students_df['primary_class'] == selected_class]
+    day_counts = db.load_student_day_counts(student_ids=class_students['student_id'])
+    metrics = utils.build_student_metrics(day_counts, class_students['student_id'])
+    
     # Get class summary
-    summary = utils.get_class_performance_summary(observations_df, students_df, selected_class)
+    summary = utils.get_class_performance_summary(None, students_df, selected_class, metrics=metrics)
     
     if len(summary) == 0:
         st.warning(f"⚠️ No students found in class {selected_class}")
@@ -142,9 +146,9 @@ def render():
     st.caption("Understanding attendance-achievement relationships and intervention priorities")
     
     # Get engagement insights
-    class_students = students_df[students_df['primary_class'] == selected_class]
-    insights = utils.get_engagement_insights(observations_df, class_students)
-    distribution = utils.get_class_engagement_distribution(observations_df, class_students)
+    engagement = utils.get_engagement_metrics(None, class_students, metrics=metrics)
+    insights = engagement['insights']
+    distribution = engagement['distribution']
     
     # Display key metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -422,19 +426,22 @@ def render():
         # Measure difficulty analysis
         st.markdown("#### Measure Performance Across Class")
         
+        # Everything recorded in this class, including students from other rosters
+        measure_counts = db.load_measure_counts(class_codes=[selected_class])
+        measure_totals = measure_counts.groupby('measure_name')[
+            ['ones', 'zeros', 'observation_count']
+        ].sum()
+        
         measure_stats = []
         for measure in utils.ENGAGEMENT_MEASURES:
-            measure_obs = observations_df[
-                (observations_df['class_code'] == selected_class) &
-                (observations_df['measure_name'] == measure)
-            ]
-            
-            if len(measure_obs) > 0:
-                perf, ones, zeros, absent, valid = utils.calculate_performance(measure_obs)
+            if measure in measure_totals.index:
+                ones = int(measure_totals.at[measure, 'ones'])
+                zeros = int(measure_totals.at[measure, 'zeros'])
+                valid = ones + zeros
                 measure_stats.append({
                     'Measure': measure,
-                    'Achievement %': perf,
-                    'Total Observations': len(measure_obs),
+                    'Achievement %': (ones / valid) * 100 if valid > 0 else None,
+                    'Total Observations': int(measure_totals.at[measure, 'observation_count']),
                     'Observed (1s)': ones,
                     'Not Observed (0s)': zeros,
                     'Valid': valid
@@ -0,0 +1,66 @@
+"""
+Shared pytest fixtures: a scratch SQLite database behind database.py
+"""
+
+import pandas as pd
+import pytest
+import streamlit as st
+from sqlalchemy import text
+
+import database as db
+
+
+@pytest.fixture
+def bare_database(tmp_path, monkeypatch):
+    """
+    Point database.py at a SQLite file holding only an un-indexed observations
+    table, as in a database that predates initialize_database's migrations
+    
+    Yields the engine. Caches are cleared before and after, so no test sees
+    another test's reads.
+    """
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'engagement.db'}")
+    monkeypatch.delenv('LOCAL_REPLICA_PATH', raising=False)
+    st.cache_data.clear()
+    
+    engine = db.get_database_connection()
+    
+    # SQLite has no SERIAL, so create observations with an autoincrementing id
+    # first; initialize_database then adds the indexes and the other tables
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE observations (
+                id INTEGER PRIMARY KEY,
+                date DATE NOT NULL,
+                class_code VARCHAR(50) NOT NULL,
+                student_id VARCHAR(50) NOT NULL,
+                measure_name VARCHAR(255) NOT NULL,
+                value VARCHAR(10) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+    
+    yield engine
+    
+    st.cache_data.clear()
+
+
+@pytest.fixture
+def database(bare_database):
+    """Scratch database with the full schema (see bare_database)"""
+    assert db.initialize_database()
+    return bare_database
+
+
+@pytest.fixture
+def roster(database):
+    """Two classes with three students each"""
+    classes = pd.DataFrame({'class_code': ['HIS20A', 'SST20'], 'class_name': ['History 20A', 'Social Studies 20']})
+    students = pd.DataFrame({
+        'student_id': ['101', '102', '103', '201', '202', '203'],
+        'name': ['Ava', 'Ben', 'Cal', 'Dee', 'Eli', 'Fay'],
+        'primary_class': ['HIS20A'] * 3 + ['SST20'] * 3
+    })
+    assert db.save_classes(classes)
+    assert db.save_students(students)
+    return students
@@ -5,37 +5,225 @@ Persistent cloud storage for student engagement data
 
 import pandas as pd
 import streamlit as st
-from sqlalchemy import create_engine, text
-from datetime import datetime
+from sqlalchemy import create_engine, text, bindparam, table, column, func, insert, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.pool import QueuePool
+from datetime import datetime, timedelta
+import csv
+import gzip
+import hashlib
+import io
 import os
+import threading
+import time
+import utils
+
+
+# Columns stored in the observations table (loaders may add derived columns)
+OBSERVATION_COLUMNS = ['date', 'class_code', 'student_id', 'measure_name', 'value']
+
+# Unique key of an observation (one value per student, measure, class and day)
+OBSERVATION_KEY = ['date', 'class_code', 'student_id', 'measure_name']
+
+# How long cached table reads stay valid (writers also invalidate explicitly)
+CACHE_TTL_SECONDS = 300
+
+# Observation batches at or above this size use COPY instead of a multi-row INSERT
+COPY_THRESHOLD = 1000
+
+# Lightweight table construct so bulk upserts can use SQLAlchemy's multi-row VALUES batching
+observations_table = table('observations', *[column(name) for name in OBSERVATION_COLUMNS + ['created_at']])
+students_table = table('students', column('student_id'), column('name'), column('primary_class'))
+
+# Column length limits of the students table, checked before bulk imports
+STUDENT_FIELD_LIMITS = {'student_id': 50, 'name': 255, 'primary_class': 50}
+
+# Rows per chunk for streaming CSV imports (bounds memory for very large files)
+IMPORT_CHUNK_ROWS = 50000
+
+# Rows fetched per round trip by streaming exports
+EXPORT_CHUNK_ROWS = 10000
+
+# Exportable tables: (columns, ORDER BY) - the orders follow existing indexes
+EXPORT_TABLES = {
+    'students': (['student_id', 'name', 'primary_class'], 'student_id'),
+    'classes': (['class_code', 'class_name'], 'class_code'),
+    'observations': (OBSERVATION_COLUMNS, ', '.join(OBSERVATION_KEY))
+}
+
+# Connection pool defaults, overridable via secrets (db_pool_size) or env (DB_POOL_SIZE)
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 5,
+    'pool_timeout': 30,
+    'pool_recycle': 300,  # Neon drops idle connections, so recycle before that happens
+}
+
+
+# Optional local SQLite replica serving analytical reads, enabled by a file path in
+# secrets (local_replica_path) or env (LOCAL_REPLICA_PATH); see sync_local_replica
+REPLICA_SYNC_SECONDS = 60
+REPLICA_FULL_SYNC_SECONDS = 6 * 3600
+
+# Incremental syncs re-read this much before the watermark so rows committed by
+# transactions still open at the previous sync are not missed
+REPLICA_WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+# Latest bulk write throughput per operation (see get_write_stats)
+_write_stats = {}
+
+# Sync state of the local replica in this process (see get_replica_status)
+_replica_state = {'ready': None, 'full_due': False, 'last_attempt': None,
+                  'last_sync': None, 'last_rows': 0, 'error': None, 'missed_writes': 0}
+_replica_lock = threading.Lock()
+
+# Bumped by invalidate_cache. Cached readers take their table's generation as an
+# argument, so a read still running when a write commits stores its stale result
+# under the old generation, where no later read looks
+_cache_generation = {'students': 0, 'classes': 0, 'observations': 0}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+    
+    def recreate(self):
+        # Keep the counters when SQLAlchemy swaps in a fresh pool (e.g. after dispose)
+        new_pool = super().recreate()
+        new_pool.checkouts = self.checkouts
+        new_pool.total_wait = self.total_wait
+        new_pool.max_wait = self.max_wait
+        return new_pool
+
+
+def _get_setting(name, default=None):
+    """
+    Read a setting from Streamlit secrets, falling back to the environment
+    
+    Args:
+        name: Lowercase secrets key; the env variable is the uppercase form
+        default: Value when neither is set
+    
+    Returns:
+        Setting value or default
+    """
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        # No secrets file configured
+        pass
+    return os.environ.get(name.upper(), default)
+
+
+def _get_pool_settings():
+    """Pool keyword arguments for create_engine"""
+    settings = {}
+    for key, default in POOL_DEFAULTS.items():
+        settings[key] = int(_get_setting(f'db_{key}', default))
+    return settings
+
+
+@st.cache_resource(show_spinner=False)
+def _create_engine(database_url, pool_size, max_overflow, pool_timeout, pool_recycle):
+    """One engine (and pool) per URL and pool configuration, shared across sessions"""
+    return create_engine(
+        database_url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True
+    )
 
 
 def get_database_connection():
     """
     Get database connection from Streamlit secrets or environment
     
+    The engine is created once per process and reused, so callers share a
+    pool of warm connections instead of reconnecting on every call.
+    
     Returns:
         sqlalchemy.engine.Engine or None
     """
     try:
-        # Try to get from Streamlit secrets first
-        if 'database_url' in st.secrets:
-            database_url = st.secrets['database_url']
-        # Fall back to environment variable
-        elif 'DATABASE_URL' in os.environ:
-            database_url = os.environ['DATABASE_URL']
-        else:
+        database_url = _get_setting('database_url')
+        if not database_url:
             return None
         
-        # Create engine
-        engine = create_engine(database_url)
-        return engine
+        return _create_engine(database_url, **_get_pool_settings())
     
     except Exception as e:
         st.error(f"Database connection error: {str(e)}")
         return None
 
 
+def _record_write(operation, rows, seconds, method):
+    """Remember throughput of the latest write for get_write_stats"""
+    _write_stats[operation] = {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds) if seconds > 0 else rows,
+        'method': method,
+        'at': datetime.now()
+    }
+
+
+def get_write_stats():
+    """
+    Throughput of the most recent bulk write per operation
+    
+    Returns:
+        dict mapping operation name to rows, seconds, rows_per_sec, method and at
+    """
+    return {operation: dict(stats) for operation, stats in _write_stats.items()}
+
+
+def get_pool_stats():
+    """
+    Report connection pool usage for the shared engine
+    
+    Returns:
+        dict with size, checked_out, checked_in, overflow, checkouts,
+        avg_wait_ms and max_wait_ms, or None if there is no database
+    """
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    pool = engine.pool
+    checkouts = getattr(pool, 'checkouts', 0)
+    total_wait = getattr(pool, 'total_wait', 0.0)
+    
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'checkouts': checkouts,
+        'avg_wait_ms': round(total_wait / checkouts * 1000, 2) if checkouts else 0.0,
+        'max_wait_ms': round(getattr(pool, 'max_wait', 0.0) * 1000, 2)
+    }
+
+
 def initialize_database():
     """
     Create tables if they don't exist
@@ -90,6 +278,54 @@ def initialize_database():
                 ON observations(date, class_code)
             """))
             
+            # One-time migration: older databases may hold repeated entries, so
+            # keep the latest of each before enforcing one value per key
+            deduplicated = 0
+            indexes = {index['name'] for index in inspect(conn).get_indexes('observations')}
+            if 'idx_observations_key' not in indexes:
+                deduplicated = conn.execute(text(f"""
+                    DELETE FROM observations
+                    WHERE id NOT IN (
+                        SELECT MAX(id) FROM observations
+                        GROUP BY {', '.join(OBSERVATION_KEY)}
+                    )
+                """)).rowcount
+                
+                conn.execute(text(f"""
+                    CREATE UNIQUE INDEX idx_observations_key 
+                    ON observations({', '.join(OBSERVATION_KEY)})
+                """))
+            
+            # Incremental backups and sync select rows changed since a watermark
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_observations_created 
+                ON observations(created_at)
+            """))
+            
+            # Progress of chunked CSV imports, so an interrupted import can resume
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS import_checkpoints (
+                    file_hash VARCHAR(64) PRIMARY KEY,
+                    file_name VARCHAR(255),
+                    rows_done BIGINT NOT NULL,
+                    rows_rejected BIGINT NOT NULL,
+                    completed BOOLEAN NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            
+            # Daily rollup of observation counts (kept in sync by the observation writers)
+            _create_rollup_table(conn)
+            
+            # Backfill a new (empty) rollup from existing observations, or
+            # rebuild it if duplicates were just removed
+            if deduplicated:
+                conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+            conn.execute(text(f"""
+                INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)})
+                {_rollup_select(f"WHERE NOT EXISTS (SELECT 1 FROM {ROLLUP_TABLE})")}
+            """))
+            
             conn.commit()
         
         return True
@@ -99,6 +335,114 @@ def initialize_database():
         return False
 
 
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def invalidate_cache(*tables):
+    """
+    Clear cached reads so the next load queries the database again
+    
+    Called by every writer after a successful commit. The cache is shared by
+    all pages and reruns, so unchanged tables are never re-queried.
+    
+    Args:
+        *tables: Table names ('students', 'classes', 'observations');
+            clears every table if none are given
+    """
+    readers = {
+        'students': [_read_students],
+        'classes': [_read_classes],
+        'observations': [_read_observations, _count_observations,
+                         _read_student_day_counts, _read_measure_counts, _read_last_observed,
+                         _read_session_index]
+    }
+    for table in tables or readers:
+        _cache_generation[table] += 1
+        for reader in readers[table]:
+            reader.clear()
+
+
+# ============================================================================
+# BULK LOADING
+# ============================================================================
+
+def _supports_copy(conn):
+    """COPY FROM STDIN needs PostgreSQL through psycopg2"""
+    return conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2'
+
+
+def _copy_rows(conn, table_name, columns, records):
+    """
+    Stream records into a table with COPY FROM STDIN
+    
+    Args:
+        conn: SQLAlchemy connection (its transaction covers the COPY)
+        table_name: Target table
+        columns: Column names, in COPY order
+        records: List of dicts keyed by columns
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([record[col] for col in columns])
+    buffer.seek(0)
+    
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _replace_table(conn, table_name, key, columns, records):
+    """
+    Make a table hold exactly the given records, in the caller's transaction
+    
+    Records are bulk loaded into a temporary staging table, merged into the
+    table with INSERT ... ON CONFLICT, and rows missing from the staging table
+    are deleted. Unchanged rows are never removed, so there is no moment
+    where the table is empty.
+    
+    Args:
+        conn: SQLAlchemy connection with an open transaction
+        table_name: Table to replace (students or classes)
+        key: Primary key column
+        columns: All columns to write
+        records: List of dicts keyed by columns (unique on key)
+    
+    Returns:
+        str: Load method used for the staging table ('copy' or 'executemany')
+    """
+    staging = f"{table_name}_staging"
+    column_list = ', '.join(columns)
+    
+    conn.execute(text(f"CREATE TEMP TABLE {staging} AS SELECT {column_list} FROM {table_name} WHERE 1 = 0"))
+    
+    if len(records) >= COPY_THRESHOLD and _supports_copy(conn):
+        method = 'copy'
+        _copy_rows(conn, staging, columns, records)
+    else:
+        method = 'executemany'
+        if records:
+            conn.execute(insert(table(staging, *[column(col) for col in columns])), records)
+    
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in columns if col != key)
+    # "WHERE true" keeps ON CONFLICT unambiguous after a SELECT (required by SQLite)
+    conn.execute(text(f"""
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list} FROM {staging} WHERE true
+        ON CONFLICT ({key}) DO UPDATE SET {updates}
+    """))
+    conn.execute(text(f"DELETE FROM {table_name} WHERE {key} NOT IN (SELECT {key} FROM {staging})"))
+    conn.execute(text(f"DROP TABLE {staging}"))
+    
+    return method
+
+
 # ============================================================================
 # STUDENTS
 # ============================================================================
@@ -115,42 +459,39 @@ def load_students():
         return pd.DataFrame(columns=['student_id', 'name', 'primary_class'])
     
     try:
-        query = "SELECT student_id, name, primary_class FROM students ORDER BY name"
-        df = pd.read_sql(query, engine)
-        df['student_id'] = df['student_id'].astype(str)
-        return df
+        return _read_students(engine, _cache_generation['students'])
     
     except Exception as e:
         st.error(f"Error loading students: {str(e)}")
         return pd.DataFrame(columns=['student_id', 'name', 'primary_class'])
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_students(_engine, generation):
+    """Cached students query (cleared by invalidate_cache)"""
+    query = "SELECT student_id, name, primary_class FROM students ORDER BY name"
+    df = pd.read_sql(query, _engine)
+    df['student_id'] = df['student_id'].astype(str)
+    return df
+
+
 def save_students(students_df):
-    """Save all students (replaces existing)"""
+    """Save all students (replaces existing, atomically)"""
     engine = get_database_connection()
     if not engine:
         return False
     
+    df = students_df[['student_id', 'name', 'primary_class']].copy()
+    df['student_id'] = df['student_id'].astype(str)
+    records = df.drop_duplicates(subset='student_id', keep='last').to_dict('records')
+    
     try:
+        start = time.perf_counter()
         with engine.connect() as conn:
-            # Clear existing students
-            conn.execute(text("DELETE FROM students"))
-            
-            # Insert new students
-            for _, row in students_df.iterrows():
-                conn.execute(
-                    text("""
-                        INSERT INTO students (student_id, name, primary_class)
-                        VALUES (:student_id, :name, :primary_class)
-                    """),
-                    {
-                        'student_id': str(row['student_id']),
-                        'name': row['name'],
-                        'primary_class': row['primary_class']
-                    }
-                )
-            
+            method = _replace_table(conn, 'students', 'student_id', list(df.columns), records)
             conn.commit()
+        _record_write('save_students', len(records), time.perf_counter() - start, method)
+        invalidate_cache('students')
         return True
     
     except Exception as e:
@@ -180,6 +521,7 @@ def add_student(student_id, name, primary_class):
                 }
             )
             conn.commit()
+        invalidate_cache('students')
         return True
     
     except Exception as e:
@@ -187,6 +529,67 @@ def add_student(student_id, name, primary_class):
         return False
 
 
+def bulk_upsert_students(students_df):
+    """
+    Insert or update many students in one transaction
+    
+    Rows are validated in pandas first: blank fields, values longer than the
+    column allows and earlier repeats of a student_id (the last one wins) are
+    rejected. The remaining rows are sent as multi-row
+    INSERT ... ON CONFLICT (student_id) DO UPDATE statements.
+    
+    Args:
+        students_df: DataFrame with columns [student_id, name, primary_class]
+    
+    Returns:
+        dict with inserted, updated and rejected counts, or None on error
+    """
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    df = students_df[['student_id', 'name', 'primary_class']].copy()
+    for col in df.columns:
+        df[col] = df[col].astype('string').str.strip()
+    
+    valid = df.notna().all(axis=1) & (df != '').all(axis=1)
+    for col, limit in STUDENT_FIELD_LIMITS.items():
+        valid &= df[col].str.len() <= limit
+    df = df[valid.fillna(False).astype(bool)]
+    df = df.drop_duplicates(subset='student_id', keep='last')
+    rejected = len(students_df) - len(df)
+    
+    if len(df) == 0:
+        return {'inserted': 0, 'updated': 0, 'rejected': rejected}
+    
+    records = df.astype(object).to_dict('records')
+    stmt = pg_insert(students_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id'],
+        set_={'name': stmt.excluded.name, 'primary_class': stmt.excluded.primary_class}
+    )
+    
+    try:
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            # Count keys that already exist inside the same transaction as the upsert
+            existing = conn.execute(
+                text("SELECT COUNT(*) FROM students WHERE student_id IN :ids").bindparams(
+                    bindparam('ids', expanding=True)
+                ),
+                {'ids': df['student_id'].tolist()}
+            ).scalar()
+            conn.execute(stmt, records)
+            conn.commit()
+        _record_write('bulk_upsert_students', len(records), time.perf_counter() - start, 'executemany')
+        invalidate_cache('students')
+        return {'inserted': len(records) - existing, 'updated': existing, 'rejected': rejected}
+    
+    except Exception as e:
+        st.error(f"Error importing students: {str(e)}")
+        return None
+
+
 def delete_student(student_id):
     """Delete a student"""
     engine = get_database_connection()
@@ -200,6 +603,7 @@ def delete_student(student_id):
                 {'student_id': str(student_id)}
             )
             conn.commit()
+        invalidate_cache('students')
         return True
     
     except Exception as e:
@@ -228,6 +632,7 @@ def update_student(student_id, name, primary_class):
                 }
             )
             conn.commit()
+        invalidate_cache('students')
         return True
     
     except Exception as e:
@@ -246,38 +651,36 @@ def load_classes():
         return pd.DataFrame(columns=['class_code', 'class_name'])
     
     try:
-        query = "SELECT class_code, class_name FROM classes ORDER BY class_code"
-        df = pd.read_sql(query, engine)
-        return df
+        return _read_classes(engine, _cache_generation['classes'])
     
     except Exception as e:
         st.error(f"Error loading classes: {str(e)}")
         return pd.DataFrame(columns=['class_code', 'class_name'])
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_classes(_engine, generation):
+    """Cached classes query (cleared by invalidate_cache)"""
+    query = "SELECT class_code, class_name FROM classes ORDER BY class_code"
+    return pd.read_sql(query, _engine)
+
+
 def save_classes(classes_df):
-    """Save all classes"""
+    """Save all classes (replaces existing, atomically)"""
     engine = get_database_connection()
     if not engine:
         return False
     
+    df = classes_df[['class_code', 'class_name']]
+    records = df.drop_duplicates(subset='class_code', keep='last').to_dict('records')
+    
     try:
+        start = time.perf_counter()
         with engine.connect() as conn:
-            conn.execute(text("DELETE FROM classes"))
-            
-            for _, row in classes_df.iterrows():
-                conn.execute(
-                    text("""
-                        INSERT INTO classes (class_code, class_name)
-                        VALUES (:class_code, :class_name)
-                    """),
-                    {
-                        'class_code': row['class_code'],
-                        'class_name': row['class_name']
-                    }
-                )
-            
+            method = _replace_table(conn, 'classes', 'class_code', list(df.columns), records)
             conn.commit()
+        _record_write('save_classes', len(records), time.perf_counter() - start, method)
+        invalidate_cache('classes')
         return True
     
     except Exception as e:
@@ -306,6 +709,7 @@ def add_class(class_code, class_name):
                 }
             )
             conn.commit()
+        invalidate_cache('classes')
         return True
     
     except Exception as e:
@@ -326,6 +730,7 @@ def delete_class(class_code):
                 {'class_code': class_code}
             )
             conn.commit()
+        invalidate_cache('classes')
         return True
     
     except Exception as e:
@@ -337,38 +742,199 @@ def delete_class(class_code):
 # OBSERVATIONS
 # ============================================================================
 
-def load_observations():
-    """Load observations from database"""
-    engine = get_database_connection()
+def load_observations(class_codes=None, student_ids=None, start=None, end=None,
+                      columns=None, compact=False):
+    """
+    Load observations from database
+    
+    Filters are applied in SQL (combined with AND) so pages only fetch the
+    rows they need; the student and date indexes cover the common cases.
+    
+    Args:
+        class_codes: Only these class codes (None for all)
+        student_ids: Only these students (None for all)
+        start: Earliest date, inclusive (None for no lower bound)
+        end: Latest date, inclusive (None for no upper bound)
+        columns: Subset of OBSERVATION_COLUMNS to fetch (None for all)
+        compact: Return the compact representation (categorical IDs and
+            measure names, int8 value codes) from utils.compact_observations
+    
+    Returns:
+        pd.DataFrame: Observations with the requested columns plus the
+            normalized measure column (utils.NORMALIZED_MEASURE_COLUMN)
+            when measure_name is included
+    """
+    columns = _observation_columns(columns)
+    filters = _observation_filter_key(class_codes, student_ids, start, end)
+    
+    engine = _analytics_engine()
     if not engine:
-        return pd.DataFrame(columns=['date', 'class_code', 'student_id', 'measure_name', 'value'])
+        return _prepare_observations(pd.DataFrame(columns=list(columns)), compact)
     
     try:
-        query = """
-            SELECT date, class_code, student_id, measure_name, value
-            FROM observations
-            ORDER BY date DESC, class_code, student_id
-        """
-        df = pd.read_sql(query, engine)
-        df['student_id'] = df['student_id'].astype(str)
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        return _read_observations(engine, _cache_generation['observations'], compact, columns, *filters)
     
     except Exception as e:
         st.error(f"Error loading observations: {str(e)}")
-        return pd.DataFrame(columns=['date', 'class_code', 'student_id', 'measure_name', 'value'])
+        return _prepare_observations(pd.DataFrame(columns=list(columns)), compact)
+
+
+def count_observations(class_codes=None, student_ids=None, start=None, end=None):
+    """
+    Count observations without loading them
+    
+    Args:
+        class_codes, student_ids, start, end: Same filters as load_observations
+    
+    Returns:
+        int: Number of matching observations (0 on error)
+    """
+    filters = _observation_filter_key(class_codes, student_ids, start, end)
+    
+    engine = _analytics_engine()
+    if not engine:
+        return 0
+    
+    try:
+        return _count_observations(engine, _cache_generation['observations'], *filters)
+    
+    except Exception as e:
+        st.error(f"Error counting observations: {str(e)}")
+        return 0
+
+
+def _observation_columns(columns):
+    """Validate a requested column subset (column names are interpolated into SQL)"""
+    if columns is None:
+        return tuple(OBSERVATION_COLUMNS)
+    
+    unknown = [col for col in columns if col not in OBSERVATION_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown observation columns: {', '.join(unknown)}")
+    return tuple(col for col in OBSERVATION_COLUMNS if col in columns)
+
+
+def _observation_filter_key(class_codes, student_ids, start, end):
+    """Normalize filter arguments into hashable values for the cached readers"""
+    if class_codes is not None:
+        class_codes = tuple(sorted({str(code) for code in class_codes}))
+    if student_ids is not None:
+        student_ids = tuple(sorted({str(sid) for sid in student_ids}))
+    if start is not None:
+        start = pd.Timestamp(start).date()
+    if end is not None:
+        end = pd.Timestamp(end).date()
+    return class_codes, student_ids, start, end
+
+
+def _observation_where(class_codes, student_ids, start, end):
+    """
+    Build the WHERE clause for filtered observation queries
+    
+    Returns:
+        tuple: (where_sql, params, expanding_bindparams)
+    """
+    clauses = []
+    params = {}
+    expanding = []
+    
+    if class_codes is not None:
+        clauses.append("class_code IN :class_codes")
+        params['class_codes'] = list(class_codes)
+        expanding.append(bindparam('class_codes', expanding=True))
+    if student_ids is not None:
+        clauses.append("student_id IN :student_ids")
+        params['student_ids'] = list(student_ids)
+        expanding.append(bindparam('student_ids', expanding=True))
+    if start is not None:
+        clauses.append("date >= :start")
+        params['start'] = start
+    if end is not None:
+        clauses.append("date <= :end")
+        params['end'] = end
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params, expanding
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_observations(_engine, generation, compact, columns, class_codes=None, student_ids=None,
+                       start=None, end=None):
+    """Cached observations query (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"""
+        SELECT {', '.join(columns)}
+        FROM observations
+        {where}
+        ORDER BY date DESC, class_code, student_id
+    """).bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    if 'student_id' in df.columns:
+        df['student_id'] = df['student_id'].astype(str)
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return _prepare_observations(df, compact)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _count_observations(_engine, generation, class_codes=None, student_ids=None, start=None, end=None):
+    """Cached observation count (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"SELECT COUNT(*) FROM observations {where}").bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        return int(conn.execute(query, params).scalar())
+
+
+def _prepare_observations(df, compact=False):
+    """Apply the optional compact representation and add the normalized measure column"""
+    if compact:
+        df = utils.compact_observations(df)
+    if 'measure_name' in df.columns:
+        df = utils.add_normalized_measure(df)
+    return df
 
 
 def save_observations(observations_df):
-    """Save observations (not typically used - use add_observations instead)"""
+    """
+    Replace ALL observations (not typically used - use add_observations instead)
+    
+    Rows are deleted and re-inserted in one transaction so the table keeps its
+    keyed schema (id, created_at, unique index). An empty DataFrame clears all
+    observations and the rollup.
+    
+    Args:
+        observations_df: DataFrame with OBSERVATION_COLUMNS
+    
+    Returns:
+        bool: True on success
+    """
     engine = get_database_connection()
     if not engine:
         return False
     
+    records = _observation_records(observations_df.to_dict('records'))
+    
+    def replace_all(conn):
+        conn.execute(text("DELETE FROM observations"))
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+        if len(records) >= COPY_THRESHOLD and _supports_copy(conn):
+            _copy_observations(conn, records)
+        elif records:
+            conn.execute(_upsert_statement(), records)
+        conn.execute(text(f"""
+            INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)})
+            {_rollup_select()}
+        """))
+    
     try:
-        # This would replace ALL observations - usually not desired
-        # Keeping for compatibility but recommend using add_observations
-        observations_df.to_sql('observations', engine, if_exists='replace', index=False)
+        with engine.connect() as conn:
+            replace_all(conn)
+            conn.commit()
+        _mirror_to_replica(replace_all)
+        invalidate_cache('observations')
         return True
     
     except Exception as e:
@@ -376,60 +942,190 @@ def save_observations(observations_df):
         return False
 
 
-def add_observations(observations_list):
+def _observation_records(observations_list):
     """
-    Add multiple observations efficiently
+    Normalize observation dicts into insert parameters
+    
+    Dates become datetime.date and student IDs strings. Repeated keys
+    (date, class_code, student_id, measure_name) keep the last value, since one
+    upsert statement cannot update the same row twice.
+    
+    Returns:
+        list: Dicts keyed by OBSERVATION_COLUMNS
+    """
+    if len(observations_list) == 0:
+        return []
+    
+    df = pd.DataFrame(list(observations_list), columns=OBSERVATION_COLUMNS)
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    df['student_id'] = df['student_id'].astype(str)
+    df = df.drop_duplicates(subset=OBSERVATION_KEY, keep='last')
+    return df.to_dict('records')
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT on the observation key, refreshing value and created_at"""
+    stmt = pg_insert(observations_table)
+    return stmt.on_conflict_do_update(
+        index_elements=OBSERVATION_KEY,
+        set_={'value': stmt.excluded.value, 'created_at': func.now()}
+    )
+
+
+def _copy_observations(conn, records):
+    """
+    Stream observation records in with COPY FROM STDIN, then upsert them
+    
+    COPY cannot resolve conflicts itself, so rows land in a temporary staging
+    table first and are merged with one INSERT ... SELECT ... ON CONFLICT.
+    
+    Args:
+        conn: SQLAlchemy connection (its transaction covers the COPY)
+        records: List of dicts keyed by OBSERVATION_COLUMNS
+    """
+    conn.execute(text("""
+        CREATE TEMP TABLE observations_staging (
+            date DATE NOT NULL,
+            class_code VARCHAR(50) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            measure_name VARCHAR(255) NOT NULL,
+            value VARCHAR(10) NOT NULL
+        ) ON COMMIT DROP
+    """))
+    
+    _copy_rows(conn, 'observations_staging', OBSERVATION_COLUMNS, records)
+    
+    conn.execute(text(f"""
+        INSERT INTO observations ({', '.join(OBSERVATION_COLUMNS)})
+        SELECT {', '.join(OBSERVATION_COLUMNS)} FROM observations_staging
+        ON CONFLICT ({', '.join(OBSERVATION_KEY)})
+        DO UPDATE SET value = EXCLUDED.value, created_at = CURRENT_TIMESTAMP
+    """))
+
+
+def _delete_replaced_measures(conn, records):
+    """
+    Remove stored measures that a replacing upsert did not include
+    
+    For each (date, class_code, student_id) in records, rows for measures
+    outside the batch are deleted so the student's entry matches the batch.
+    """
+    measures_by_student = {}
+    for record in records:
+        group = (record['date'], record['class_code'], record['student_id'])
+        measures_by_student.setdefault(group, []).append(record['measure_name'])
+    
+    stmt = text("""
+        DELETE FROM observations
+        WHERE date = :date AND class_code = :class_code AND student_id = :student_id
+          AND measure_name NOT IN :measures
+    """).bindparams(bindparam('measures', expanding=True))
+    
+    for (obs_date, class_code, student_id), measures in measures_by_student.items():
+        conn.execute(stmt, {
+            'date': obs_date,
+            'class_code': class_code,
+            'student_id': student_id,
+            'measures': measures
+        })
+
+
+def upsert_observations(observations_list, replace=False):
+    """
+    Insert or update observations in one transaction
+    
+    Rows are matched on (date, class_code, student_id, measure_name): new keys
+    are inserted and existing ones get the new value. Only the rows in the
+    batch are written. Small batches go through one multi-row INSERT; batches
+    of COPY_THRESHOLD rows or more are streamed with COPY when the driver
+    supports it.
     
     Args:
         observations_list: List of dicts with keys [date, class_code, student_id, measure_name, value]
+        replace: Also delete measures stored for the same student, date and
+            class that are not in the batch (replaces each student's entry)
+    
+    Returns:
+        bool: True on success
     """
     engine = get_database_connection()
     if not engine:
         return False
     
+    records = _observation_records(observations_list)
+    if not records:
+        return True
+    
+    date_classes = {(record['date'], record['class_code']) for record in records}
+    
     try:
+        start = time.perf_counter()
         with engine.connect() as conn:
-            for obs in observations_list:
-                conn.execute(
-                    text("""
-                        INSERT INTO observations (date, class_code, student_id, measure_name, value)
-                        VALUES (:date, :class_code, :student_id, :measure_name, :value)
-                    """),
-                    {
-                        'date': obs['date'],
-                        'class_code': obs['class_code'],
-                        'student_id': str(obs['student_id']),
-                        'measure_name': obs['measure_name'],
-                        'value': obs['value']
-                    }
-                )
+            if len(records) >= COPY_THRESHOLD and _supports_copy(conn):
+                method = 'copy'
+                _copy_observations(conn, records)
+            else:
+                method = 'executemany'
+                conn.execute(_upsert_statement(), records)
+            if replace:
+                _delete_replaced_measures(conn, records)
+            _refresh_rollup(conn, date_classes)
             conn.commit()
+        _record_write('upsert_observations', len(records), time.perf_counter() - start, method)
+        
+        def mirror(replica_conn):
+            replica_conn.execute(_upsert_statement(), records)
+            if replace:
+                _delete_replaced_measures(replica_conn, records)
+            _refresh_rollup(replica_conn, date_classes)
+        
+        _mirror_to_replica(mirror)
+        invalidate_cache('observations')
         return True
     
     except Exception as e:
-        st.error(f"Error adding observations: {str(e)}")
+        st.error(f"Error saving observations: {str(e)}")
         return False
 
 
-def delete_observations(observation_date, class_code):
-    """Delete observations for specific date and class"""
-    engine = get_database_connection()
-    if not engine:
+def add_observations(observations_list):
+    """
+    Add multiple observations efficiently
+    
+    Uses upsert_observations, so re-adding an existing key updates its value
+    instead of failing on the unique index.
+    
+    Args:
+        observations_list: List of dicts with keys [date, class_code, student_id, measure_name, value]
+    """
+    return upsert_observations(observations_list)
+
+
+def delete_observations(observation_date, class_code):
+    """Delete observations for specific date and class"""
+    engine = get_database_connection()
+    if not engine:
         return False
     
+    def delete(conn):
+        conn.execute(
+            text("""
+                DELETE FROM observations 
+                WHERE date = :date AND class_code = :class_code
+            """),
+            {
+                'date': observation_date,
+                'class_code': class_code
+            }
+        )
+        _refresh_rollup(conn, {(observation_date, class_code)})
+    
     try:
         with engine.connect() as conn:
-            conn.execute(
-                text("""
-                    DELETE FROM observations 
-                    WHERE date = :date AND class_code = :class_code
-                """),
-                {
-                    'date': observation_date,
-                    'class_code': class_code
-                }
-            )
+            delete(conn)
             conn.commit()
+        _mirror_to_replica(delete)
+        invalidate_cache('observations')
         return True
     
     except Exception as e:
@@ -437,6 +1133,873 @@ def delete_observations(observation_date, class_code):
         return False
 
 
+# ============================================================================
+# AGGREGATES
+# ============================================================================
+
+# Per-value counters shared by the aggregate queries
+VALUE_COUNT_COLUMNS = """
+    SUM(CASE WHEN value = '1' THEN 1 ELSE 0 END) AS ones,
+    SUM(CASE WHEN value = '0' THEN 1 ELSE 0 END) AS zeros,
+    SUM(CASE WHEN value = '-' THEN 1 ELSE 0 END) AS not_applicable,
+    COUNT(*) AS observation_count
+"""
+
+
+def load_student_day_counts(student_ids=None, class_codes=None, start=None, end=None):
+    """
+    Load per-student counts aggregated in the database
+    
+    Summed from the daily rollup rather than raw observations. A day is
+    absent when every observation for the student on that date is '0'
+    (across classes), matching utils.get_days_absent. Pass the result to
+    utils.build_student_metrics for the same metrics as
+    utils.get_student_metrics.
+    
+    Args:
+        student_ids, class_codes, start, end: Same filters as load_observations
+    
+    Returns:
+        pd.DataFrame: Indexed by student_id with columns [ones, zeros,
+            not_applicable, total_days, days_absent, last_date]
+    """
+    filters = _observation_filter_key(class_codes, student_ids, start, end)
+    empty = pd.DataFrame(
+        columns=['ones', 'zeros', 'not_applicable', 'total_days', 'days_absent', 'last_date'],
+        index=pd.Index([], name='student_id')
+    )
+    
+    engine = _analytics_engine()
+    if not engine:
+        return empty
+    
+    try:
+        return _read_student_day_counts(engine, _cache_generation['observations'], *filters)
+    
+    except Exception as e:
+        st.error(f"Error loading student counts: {str(e)}")
+        return empty
+
+
+def load_measure_counts(student_ids=None, class_codes=None, start=None, end=None):
+    """
+    Load per-(student, class, measure) value counts aggregated in the database
+    
+    Args:
+        student_ids, class_codes, start, end: Same filters as load_observations
+    
+    Returns:
+        pd.DataFrame: Columns [student_id, class_code, measure_name, ones,
+            zeros, not_applicable, observation_count]
+    """
+    filters = _observation_filter_key(class_codes, student_ids, start, end)
+    empty = pd.DataFrame(columns=['student_id', 'class_code', 'measure_name', 'ones',
+                                  'zeros', 'not_applicable', 'observation_count'])
+    
+    engine = _analytics_engine()
+    if not engine:
+        return empty
+    
+    try:
+        return _read_measure_counts(engine, _cache_generation['observations'], *filters)
+    
+    except Exception as e:
+        st.error(f"Error loading measure counts: {str(e)}")
+        return empty
+
+
+def load_last_observed(student_ids=None, class_codes=None):
+    """
+    Load each student's latest observation date
+    
+    One MAX(date) per student from the daily rollup, cached until the next
+    write, so pages never scan raw observations for it. Shared by the entry
+    log and, through load_student_day_counts' last_date, the dashboards.
+    
+    Args:
+        student_ids, class_codes: Same filters as load_observations
+    
+    Returns:
+        pd.Series: Latest date (datetime64) indexed by student_id; students
+            without observations are left out
+    """
+    filters = _observation_filter_key(class_codes, student_ids, None, None)
+    empty = pd.Series(pd.to_datetime([]), index=pd.Index([], name='student_id'), name='last_date')
+    
+    engine = _analytics_engine()
+    if not engine:
+        return empty
+    
+    try:
+        return _read_last_observed(engine, _cache_generation['observations'], *filters)
+    
+    except Exception as e:
+        st.error(f"Error loading last observation dates: {str(e)}")
+        return empty
+
+
+def load_session_index(class_codes=None, start=None, end=None):
+    """
+    Load which students have observations in each class session
+    
+    Built from the daily rollup (one row per date, class and student) and
+    cached until the next write, so checking whether a date already has data
+    is a dictionary lookup instead of a scan over observations.
+    
+    Args:
+        class_codes, start, end: Same filters as load_observations
+    
+    Returns:
+        dict: (class_code, datetime.date) -> frozenset of student IDs
+    """
+    filters = _observation_filter_key(class_codes, None, start, end)
+    
+    engine = _analytics_engine()
+    if not engine:
+        return {}
+    
+    try:
+        return _read_session_index(engine, _cache_generation['observations'], *filters)
+    
+    except Exception as e:
+        st.error(f"Error loading observation sessions: {str(e)}")
+        return {}
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_student_day_counts(_engine, generation, class_codes=None, student_ids=None, start=None, end=None):
+    """Cached per-student day counts (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"""
+        SELECT student_id,
+               SUM(ones) AS ones,
+               SUM(zeros) AS zeros,
+               SUM(not_applicable) AS not_applicable,
+               COUNT(*) AS total_days,
+               SUM(CASE WHEN zeros = observation_count THEN 1 ELSE 0 END) AS days_absent,
+               MAX(date) AS last_date
+        FROM (
+            SELECT student_id, date,
+                   SUM(ones) AS ones,
+                   SUM(zeros) AS zeros,
+                   SUM(not_applicable) AS not_applicable,
+                   SUM(observation_count) AS observation_count
+            FROM {ROLLUP_TABLE}
+            {where}
+            GROUP BY student_id, date
+        ) daily
+        GROUP BY student_id
+    """).bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    df['student_id'] = df['student_id'].astype(str)
+    df['last_date'] = pd.to_datetime(df['last_date'])
+    return df.set_index('student_id')
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_measure_counts(_engine, generation, class_codes=None, student_ids=None, start=None, end=None):
+    """Cached per-(student, class, measure) counts (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"""
+        SELECT student_id, class_code, measure_name, {VALUE_COUNT_COLUMNS}
+        FROM observations
+        {where}
+        GROUP BY student_id, class_code, measure_name
+    """).bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    df['student_id'] = df['student_id'].astype(str)
+    return df
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_last_observed(_engine, generation, class_codes=None, student_ids=None, start=None, end=None):
+    """Cached latest observation date per student (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"""
+        SELECT student_id, MAX(date) AS last_date
+        FROM {ROLLUP_TABLE}
+        {where}
+        GROUP BY student_id
+    """).bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    df['student_id'] = df['student_id'].astype(str)
+    return pd.to_datetime(df.set_index('student_id')['last_date'])
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _read_session_index(_engine, generation, class_codes=None, student_ids=None, start=None, end=None):
+    """Cached (class_code, date) -> student IDs index (cleared by invalidate_cache)"""
+    where, params, expanding = _observation_where(class_codes, student_ids, start, end)
+    query = text(f"""
+        SELECT class_code, date, student_id
+        FROM {ROLLUP_TABLE}
+        {where}
+    """).bindparams(*expanding)
+    
+    with _engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    df['student_id'] = df['student_id'].astype(str)
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    return {
+        session: frozenset(student_ids)
+        for session, student_ids in df.groupby(['class_code', 'date'])['student_id']
+    }
+
+
+# ============================================================================
+# ROLLUP
+# ============================================================================
+
+# One row per (date, class_code, student_id) with value counts and an absent flag
+ROLLUP_TABLE = 'observation_daily_rollup'
+ROLLUP_COLUMNS = ['date', 'class_code', 'student_id', 'ones', 'zeros',
+                  'not_applicable', 'observation_count', 'absent']
+
+
+def _create_rollup_table(conn):
+    """Create the rollup table and its student index if they don't exist"""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            date DATE NOT NULL,
+            class_code VARCHAR(50) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            ones INTEGER NOT NULL,
+            zeros INTEGER NOT NULL,
+            not_applicable INTEGER NOT NULL,
+            observation_count INTEGER NOT NULL,
+            absent BOOLEAN NOT NULL,
+            PRIMARY KEY (date, class_code, student_id)
+        )
+    """))
+    
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS idx_rollup_student 
+        ON {ROLLUP_TABLE}(student_id)
+    """))
+
+
+def _rollup_select(where=""):
+    """SELECT producing rollup rows from raw observations matching the WHERE clause"""
+    return f"""
+        SELECT date, class_code, student_id, {VALUE_COUNT_COLUMNS},
+               SUM(CASE WHEN value = '0' THEN 1 ELSE 0 END) = COUNT(*) AS absent
+        FROM observations
+        {where}
+        GROUP BY date, class_code, student_id
+    """
+
+
+def _refresh_rollup(conn, date_classes):
+    """
+    Recompute rollup rows for the given (date, class_code) pairs
+    
+    Runs on the caller's connection so the rollup commits (or rolls back)
+    together with the observation write.
+    
+    Args:
+        conn: SQLAlchemy connection with an open transaction
+        date_classes: Iterable of (date, class_code) pairs touched by the write
+    """
+    pairs = {(pd.Timestamp(obs_date).date(), class_code) for obs_date, class_code in date_classes}
+    params = [{'date': obs_date, 'class_code': class_code} for obs_date, class_code in sorted(pairs)]
+    if not params:
+        return
+    
+    conn.execute(
+        text(f"DELETE FROM {ROLLUP_TABLE} WHERE date = :date AND class_code = :class_code"),
+        params
+    )
+    conn.execute(
+        text(f"""
+            INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)})
+            {_rollup_select("WHERE date = :date AND class_code = :class_code")}
+        """),
+        params
+    )
+
+
+def rebuild_rollup():
+    """
+    Regenerate the daily rollup from scratch in one transaction
+    
+    Returns:
+        int or None: Number of rollup rows written, None on error
+    """
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    def rebuild(conn):
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+        conn.execute(text(f"""
+            INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)})
+            {_rollup_select()}
+        """))
+    
+    try:
+        with engine.connect() as conn:
+            rebuild(conn)
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {ROLLUP_TABLE}")).scalar()
+            conn.commit()
+        _mirror_to_replica(rebuild)
+        invalidate_cache('observations')
+        return int(rows)
+    
+    except Exception as e:
+        st.error(f"Error rebuilding rollup: {str(e)}")
+        return None
+
+
+def load_rollup():
+    """
+    Load the stored daily rollup (for verification against a rebuild)
+    
+    Returns:
+        pd.DataFrame: ROLLUP_COLUMNS sorted by date, class_code, student_id
+    """
+    engine = get_database_connection()
+    if not engine:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    
+    try:
+        query = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {ROLLUP_TABLE} ORDER BY date, class_code, student_id"
+        df = pd.read_sql(query, engine)
+        df['student_id'] = df['student_id'].astype(str)
+        df['date'] = pd.to_datetime(df['date'])
+        df['absent'] = df['absent'].astype(bool)
+        return df
+    
+    except Exception as e:
+        st.error(f"Error loading rollup: {str(e)}")
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def file_sha256(file_obj, block_size=1 << 20):
+    """
+    Hash a file object in blocks (the read position is reset afterwards)
+    
+    Returns:
+        str: Hex digest identifying the file for import checkpoints
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for block in iter(lambda: file_obj.read(block_size), b''):
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def get_import_checkpoint(file_hash):
+    """
+    Get the saved progress of a CSV import
+    
+    Returns:
+        dict with file_name, rows_done, rows_rejected and completed, or None
+    """
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("""
+                    SELECT file_name, rows_done, rows_rejected, completed
+                    FROM import_checkpoints WHERE file_hash = :file_hash
+                """),
+                {'file_hash': file_hash}
+            ).mappings().first()
+        return dict(row) if row else None
+    
+    except Exception as e:
+        st.error(f"Error loading import checkpoint: {str(e)}")
+        return None
+
+
+def _save_import_checkpoint(file_hash, file_name, rows_done, rows_rejected, completed):
+    """Record how many CSV rows an import has processed"""
+    engine = get_database_connection()
+    with engine.connect() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO import_checkpoints
+                    (file_hash, file_name, rows_done, rows_rejected, completed, updated_at)
+                VALUES (:file_hash, :file_name, :rows_done, :rows_rejected, :completed, CURRENT_TIMESTAMP)
+                ON CONFLICT (file_hash) DO UPDATE
+                SET file_name = :file_name, rows_done = :rows_done,
+                    rows_rejected = :rows_rejected, completed = :completed,
+                    updated_at = CURRENT_TIMESTAMP
+            """),
+            {
+                'file_hash': file_hash,
+                'file_name': file_name,
+                'rows_done': rows_done,
+                'rows_rejected': rows_rejected,
+                'completed': completed
+            }
+        )
+        conn.commit()
+
+
+def import_observations_csv(file_obj, file_name, file_hash=None, chunksize=IMPORT_CHUNK_ROWS,
+                            progress=None):
+    """
+    Stream an observations CSV into the database in fixed-size chunks
+    
+    Each chunk is cleaned with utils.clean_observation_chunk (against the
+    cached student and class sets) and upserted, so memory stays bounded by
+    the chunk size. A checkpoint keyed by the file hash is saved after every
+    chunk; importing the same file again after an interruption skips the rows
+    already done. Chunks are upserts, so replaying one is harmless.
+    
+    Args:
+        file_obj: Binary file object (e.g. a Streamlit UploadedFile)
+        file_name: Name shown for the checkpoint
+        file_hash: Precomputed file_sha256 (computed if omitted)
+        chunksize: CSV rows per chunk
+        progress: Optional callback(rows_done, fraction_of_file_read)
+    
+    Returns:
+        dict with imported, rejected, resumed_from and completed, or None
+        without a database
+    """
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    file_hash = file_hash or file_sha256(file_obj)
+    checkpoint = get_import_checkpoint(file_hash)
+    resumed_from = checkpoint['rows_done'] if checkpoint and not checkpoint['completed'] else 0
+    rows_done = resumed_from
+    rows_rejected = checkpoint['rows_rejected'] if resumed_from else 0
+    
+    valid_students = set(load_students()['student_id'])
+    valid_classes = set(load_classes()['class_code'])
+    
+    file_obj.seek(0, os.SEEK_END)
+    file_size = file_obj.tell() or 1
+    file_obj.seek(0)
+    
+    reader = pd.read_csv(
+        file_obj,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunksize,
+        # Skip data rows finished by an earlier run (row 0 is the header)
+        skiprows=(lambda i: 0 < i <= resumed_from) if resumed_from else None
+    )
+    
+    result = {'imported': 0, 'rejected': rows_rejected, 'resumed_from': resumed_from, 'completed': False}
+    
+    try:
+        # Closing the reader through the context manager leaves file_obj open
+        with reader:
+            for chunk in reader:
+                clean, rejected = utils.clean_observation_chunk(chunk, valid_students, valid_classes)
+                if len(clean) > 0 and not upsert_observations(clean.to_dict('records')):
+                    # upsert_observations already reported the error; the checkpoint allows a resume
+                    return result
+                
+                rows_done += len(chunk)
+                result['imported'] += len(clean)
+                result['rejected'] += rejected
+                _save_import_checkpoint(file_hash, file_name, rows_done, result['rejected'], False)
+                
+                if progress:
+                    progress(rows_done, min(file_obj.tell() / file_size, 1.0))
+        
+        _save_import_checkpoint(file_hash, file_name, rows_done, result['rejected'], True)
+        result['completed'] = True
+        return result
+    
+    except Exception as e:
+        st.error(f"Error importing observations: {str(e)}")
+        return result
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_table_csv_gz(table_name, file_obj, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream a table into a binary file object as gzip-compressed CSV
+    
+    Rows are fetched through a server-side cursor chunk_rows at a time and
+    written as they arrive, so memory stays bounded whatever the table size.
+    
+    Args:
+        table_name: One of EXPORT_TABLES
+        file_obj: Writable binary file object (left open)
+        chunk_rows: Rows fetched per round trip
+    
+    Returns:
+        int or None: Rows written, None without a database or on error
+    """
+    columns, order_by = EXPORT_TABLES[table_name]
+    
+    engine = get_database_connection()
+    if not engine:
+        return None
+    
+    try:
+        rows = 0
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(
+                text(f"SELECT {', '.join(columns)} FROM {table_name} ORDER BY {order_by}")
+            )
+            with gzip.GzipFile(fileobj=file_obj, mode='wb') as compressed, \
+                    io.TextIOWrapper(compressed, encoding='utf-8', newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(columns)
+                for partition in result.partitions(chunk_rows):
+                    writer.writerows(partition)
+                    rows += len(partition)
+        return rows
+    
+    except Exception as e:
+        st.error(f"Error exporting {table_name}: {str(e)}")
+        return None
+
+
+def stream_observations(since=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yield observations with created_at in DataFrame chunks, ordered by date
+    
+    Uses a server-side cursor like export_table_csv_gz, so only one chunk is
+    held in memory at a time. Inserts and upserts set created_at, which makes
+    it usable as a change watermark.
+    
+    Args:
+        since: Only rows with created_at after this timestamp (None for all)
+        chunk_rows: Rows per chunk
+    
+    Yields:
+        pd.DataFrame: OBSERVATION_COLUMNS plus created_at
+    """
+    engine = get_database_connection()
+    if not engine:
+        return
+    
+    columns = OBSERVATION_COLUMNS + ['created_at']
+    where = "WHERE created_at > :since" if since is not None else ""
+    query = text(f"""
+        SELECT {', '.join(columns)} FROM observations
+        {where}
+        ORDER BY {', '.join(OBSERVATION_KEY)}
+    """)
+    
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(
+            query, {'since': since} if since is not None else {}
+        )
+        for partition in result.partitions(chunk_rows):
+            df = pd.DataFrame(partition, columns=columns)
+            df['student_id'] = df['student_id'].astype(str)
+            df['date'] = pd.to_datetime(df['date'])
+            df['created_at'] = pd.to_datetime(df['created_at'])
+            yield df
+
+
+# ============================================================================
+# LOCAL REPLICA
+# ============================================================================
+
+@st.cache_resource(show_spinner=False)
+def _create_replica_engine(path):
+    """One engine per replica file; creates the local tables on first use"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        # WAL lets pages keep reading while a sync is writing
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        
+        # Same columns and key as the database, so the observation queries,
+        # upserts and rollup refreshes run unchanged
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS observations (
+                date DATE NOT NULL,
+                class_code VARCHAR(50) NOT NULL,
+                student_id VARCHAR(50) NOT NULL,
+                measure_name VARCHAR(255) NOT NULL,
+                value VARCHAR(10) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_key 
+            ON observations({', '.join(OBSERVATION_KEY)})
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_observations_student 
+            ON observations(student_id)
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_observations_date 
+            ON observations(date, class_code)
+        """))
+        _create_rollup_table(conn)
+        
+        # Sync watermark and time of the last full copy
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS replica_state (
+                key VARCHAR(50) PRIMARY KEY,
+                value VARCHAR(50)
+            )
+        """))
+        conn.commit()
+    return engine
+
+
+def get_replica_connection():
+    """
+    Get the local replica engine when a replica path is configured
+    
+    Returns:
+        sqlalchemy.engine.Engine or None
+    """
+    path = _get_setting('local_replica_path')
+    if not path:
+        return None
+    
+    try:
+        return _create_replica_engine(path)
+    
+    except Exception as e:
+        st.error(f"Local replica error: {str(e)}")
+        return None
+
+
+def _get_replica_values(conn):
+    """Stored replica state (watermark, full_synced_at) as a dict of strings"""
+    rows = conn.execute(text("SELECT key, value FROM replica_state")).all()
+    return dict(rows)
+
+
+def _replica_ready(replica):
+    """Whether the replica has completed a full copy (checked once per process)"""
+    if _replica_state['ready'] is None:
+        with replica.connect() as conn:
+            _replica_state['ready'] = 'full_synced_at' in _get_replica_values(conn)
+    return _replica_state['ready']
+
+
+def _mark_replica_stale(full=False):
+    """Make the next analytical read start a sync (a full copy if full=True)"""
+    _replica_state['last_attempt'] = None
+    if full:
+        _replica_state['full_due'] = True
+
+
+def _mark_replica_behind():
+    """The replica missed a write: read from the database until a full copy includes it"""
+    _replica_state['missed_writes'] += 1
+    _replica_state['ready'] = False
+    _mark_replica_stale(full=True)
+
+
+def _mirror_to_replica(apply):
+    """
+    Repeat a committed observation write on the local replica
+    
+    Pages read back their own writes immediately, without waiting for the
+    next sync. A running sync holds the replica's write lock for its whole
+    transaction, so rather than wait on it inside the user's save the write
+    is skipped. A skipped or failed mirror sends reads to the database until
+    the next full copy.
+    
+    Args:
+        apply: Callable(conn) running the write's statements (the observation
+            upserts, deletes and rollup refreshes also run on SQLite)
+    """
+    replica = get_replica_connection()
+    if replica is None:
+        return
+    
+    if not _replica_lock.acquire(blocking=False):
+        _mark_replica_behind()
+        return
+    
+    try:
+        if not _replica_ready(replica):
+            # The initial full copy will include the write
+            return
+        with replica.connect() as conn:
+            apply(conn)
+            conn.commit()
+    
+    except Exception as e:
+        _replica_state['error'] = str(e)
+        _mark_replica_behind()
+    
+    finally:
+        _replica_lock.release()
+
+
+def sync_local_replica(full=False):
+    """
+    Bring the local replica up to date with the database
+    
+    Incremental runs copy observations whose created_at is after the stored
+    watermark (minus REPLICA_WATERMARK_OVERLAP); inserts and upserts both set
+    created_at, and the local rollup is refreshed for the dates and classes
+    touched. Deletes made by this process are mirrored as they happen; a full
+    copy (at least every REPLICA_FULL_SYNC_SECONDS) also picks up deletes
+    made elsewhere. Only one sync runs at a time - a concurrent call returns
+    None straight away.
+    
+    Args:
+        full: Recopy every observation instead of only the changes
+    
+    Returns:
+        int or None: Observations copied, None if skipped or on error
+    """
+    replica = get_replica_connection()
+    if replica is None or not get_database_connection():
+        return None
+    
+    if not _replica_lock.acquire(blocking=False):
+        return None
+    
+    _replica_state['last_attempt'] = time.monotonic()
+    missed_writes = _replica_state['missed_writes']
+    try:
+        with replica.connect() as conn:
+            stored = _get_replica_values(conn)
+            full_synced_at = stored.get('full_synced_at')
+            full = (
+                full or _replica_state['full_due'] or full_synced_at is None
+                or (datetime.now() - datetime.fromisoformat(full_synced_at)).total_seconds()
+                >= REPLICA_FULL_SYNC_SECONDS
+            )
+            
+            since = None
+            watermark = None
+            if full:
+                conn.execute(text("DELETE FROM observations"))
+            elif stored.get('watermark'):
+                watermark = datetime.fromisoformat(stored['watermark'])
+                since = watermark - REPLICA_WATERMARK_OVERLAP
+            
+            rows = 0
+            date_classes = set()
+            for df in stream_observations(since=since):
+                records = df.assign(date=df['date'].dt.date)[OBSERVATION_COLUMNS].to_dict('records')
+                conn.execute(_upsert_statement(), records)
+                if not full:
+                    date_classes.update(zip(df['date'], df['class_code']))
+                rows += len(df)
+                latest = df['created_at'].max()
+                if pd.notna(latest) and (watermark is None or latest > watermark):
+                    watermark = latest
+            
+            if full:
+                conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+                conn.execute(text(f"""
+                    INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)})
+                    {_rollup_select()}
+                """))
+            else:
+                _refresh_rollup(conn, date_classes)
+            
+            values = {}
+            if watermark is not None:
+                values['watermark'] = watermark.isoformat()
+            if full:
+                values['full_synced_at'] = datetime.now().isoformat()
+            if values:
+                conn.execute(
+                    text("""
+                        INSERT INTO replica_state (key, value) VALUES (:key, :value)
+                        ON CONFLICT (key) DO UPDATE SET value = :value
+                    """),
+                    [{'key': key, 'value': value} for key, value in values.items()]
+                )
+            conn.commit()
+        
+        _replica_state.update(last_sync=datetime.now(), last_rows=rows, error=None)
+        if _replica_state['missed_writes'] == missed_writes:
+            _replica_state['ready'] = True
+            if full:
+                _replica_state['full_due'] = False
+        else:
+            # A write skipped its mirror while this sync ran and may be missing
+            # from it; stay on the database until the next full copy
+            _replica_state['last_attempt'] = None
+        if rows or full:
+            invalidate_cache('observations')
+        return rows
+    
+    except Exception as e:
+        # Keep serving the last synced data; the next due read retries
+        _replica_state['error'] = str(e)
+        return None
+    
+    finally:
+        _replica_lock.release()
+
+
+def _analytics_engine():
+    """
+    Engine for analytical reads: the local replica once it holds a full copy,
+    otherwise the database
+    
+    A due sync is started in a background thread, so reads never wait on the
+    remote database while the replica is in use.
+    """
+    replica = get_replica_connection()
+    if replica is None:
+        return get_database_connection()
+    
+    last_attempt = _replica_state['last_attempt']
+    if not _replica_lock.locked() and (
+            last_attempt is None or time.monotonic() - last_attempt >= REPLICA_SYNC_SECONDS):
+        _replica_state['last_attempt'] = time.monotonic()
+        threading.Thread(target=sync_local_replica, daemon=True).start()
+    
+    try:
+        if _replica_ready(replica):
+            return replica
+    except Exception as e:
+        _replica_state['error'] = str(e)
+    return get_database_connection()
+
+
+def get_replica_status():
+    """
+    Report the state of the local replica
+    
+    Returns:
+        dict with ready, observations, last_sync, last_rows and error, or
+        None if no replica is configured
+    """
+    replica = get_replica_connection()
+    if replica is None:
+        return None
+    
+    status = {key: _replica_state[key] for key in ['last_sync', 'last_rows', 'error']}
+    try:
+        status['ready'] = _replica_ready(replica)
+        with replica.connect() as conn:
+            status['observations'] = int(conn.execute(text("SELECT COUNT(*) FROM observations")).scalar())
+    except Exception as e:
+        status.update(ready=False, observations=0, error=str(e))
+    return status
+
+
 # ============================================================================
 # UTILITY
 # ============================================================================
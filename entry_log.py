@@ -8,16 +8,25 @@ import database as db
 import utils
 
 
+# Measure abbreviations for column headers (5 measures - more spacious)
+MEASURE_ABBREVIATIONS = {
+    "Time on Task": "Time on Task",
+    "Asked/Answered/Shared": "Ask/Ans/Share",
+    "Engaged with Content and Others": "Content & Others",
+    "Materials/Organized": "Materials",
+    "Seeks Teacher Support": "Teacher Support"
+}
+
+
 def render():
     """Render the Quick Entry Log page"""
     
     st.title("📝 Quick Entry Log")
     st.markdown("Record student engagement observations for your class")
     
-    # Load data
+    # Load data (cached in the database module; observations are loaded per class below)
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
     
     # Check if setup is complete
     if len(classes_df) == 0:
@@ -53,17 +62,15 @@ def render():
         st.session_state.selected_observation_date = observation_date
         
         # Check if observations already exist for this date/class combination
-        existing_obs = db.load_observations()
-        has_existing = False
-        if len(existing_obs) > 0:
-            existing_mask = (pd.to_datetime(existing_obs['date']).dt.date == observation_date) & \
-                           (existing_obs['class_code'] == st.session_state.get('selected_class_code', ''))
-            has_existing = existing_mask.any()
-            
-            if has_existing:
-                # Count how many students have data
-                students_with_data = existing_obs[existing_mask]['student_id'].nunique()
-                st.error(f"⚠️ **WARNING:** Observations already exist for this date! {students_with_data} students have data that will be OVERWRITTEN if you save.")
+        previous_class = st.session_state.get('selected_class_code', '')
+        existing_students = db.load_session_index(class_codes=[previous_class]).get(
+            (previous_class, observation_date), frozenset()
+        )
+        
+        if existing_students:
+            # Count how many students have data
+            students_with_data = len(existing_students)
+            st.error(f"⚠️ **WARNING:** Observations already exist for this date! {students_with_data} students have data that will be OVERWRITTEN if you save.")
     
     with col2:
         st.markdown("### 👥 Select Class")
@@ -89,9 +96,16 @@ def render():
         st.warning(f"⚠️ No students found in class {selected_class}")
         return
     
-    # Calculate last observation info for each student
-    class_students['last_obs_date'] = class_students['student_id'].apply(
-        lambda sid: utils.get_days_since_last_observation(observations_df, sid)
+    # Students observed in each session (class, date) of this class
+    sessions = db.load_session_index(class_codes=[selected_class])
+    
+    # Days since each student's last observation in any class (None if never)
+    last_observed = db.load_last_observed(student_ids=class_students['student_id'])
+    days_since = utils.get_days_since(last_observed.reindex(class_students['student_id']))
+    class_students['last_obs_date'] = pd.Series(
+        [None if pd.isna(days) else int(days) for days in days_since],
+        index=class_students.index,
+        dtype=object
     )
     
     st.markdown("---")
@@ -100,14 +114,17 @@ def render():
     st.markdown("### 📂 Existing Data for This Date")
     
     # Check if data exists for selected date/class
-    existing_obs_for_date = db.load_observations()
-    if len(existing_obs_for_date) > 0:
-        existing_mask = (pd.to_datetime(existing_obs_for_date['date']).dt.date == observation_date) & \
-                       (existing_obs_for_date['class_code'] == selected_class)
-        existing_data = existing_obs_for_date[existing_mask]
-        
-        if len(existing_data) > 0:
-            students_with_data = existing_data['student_id'].nunique()
+    if len(sessions) > 0:
+        session_students = sessions.get((selected_class, observation_date), frozenset())
+        
+        if len(session_students) > 0:
+            # Only this session's observations are loaded (to count and to fill the form)
+            existing_data = db.load_observations(
+                class_codes=[selected_class],
+                start=observation_date,
+                end=observation_date
+            )
+            students_with_data = len(session_students)
             total_observations = len(existing_data)
             
             st.info(f"""
@@ -141,6 +158,9 @@ def render():
                         elif obs['student_id'] not in st.session_state.attendance_status:
                             st.session_state.attendance_status[obs['student_id']] = 'present'
                     
+                    # Show the loaded values instead of the data editor's pending edits
+                    st.session_state.entry_grid_version = st.session_state.get('entry_grid_version', 0) + 1
+                    
                     st.success(f"✅ Loaded {loaded_count} observations for {students_with_data} students")
                     st.rerun()
             
@@ -171,12 +191,18 @@ def render():
             
             You can enter observations below.
             """)
-    else:
-        st.success(f"""
+    elif db.count_observations() == 0:
+        st.success("""
         ✅ **No observations in database yet**
         
         This is your first observation session!
         """)
+    else:
+        st.success(f"""
+        ✅ **No observations for {selected_class} yet**
+        
+        This is the first observation session for this class.
+        """)
     
     st.markdown("---")
     
@@ -206,24 +232,21 @@ def render():
     st.subheader(f"Students in {selected_class} ({len(class_students)} students)")
     
     # Show recent observation dates for this class
-    recent_dates = db.load_observations()
-    if len(recent_dates) > 0:
-        class_dates = recent_dates[recent_dates['class_code'] == selected_class]
-        if len(class_dates) > 0:
-            unique_dates = pd.to_datetime(class_dates['date']).dt.date.unique()
-            unique_dates = sorted(unique_dates, reverse=True)[:5]  # Last 5 dates
-            
-            with st.expander("📅 Recent observation dates for this class", expanded=False):
-                st.markdown("**Last 5 observation dates:**")
-                for obs_date in unique_dates:
-                    students_observed = len(class_dates[pd.to_datetime(class_dates['date']).dt.date == obs_date]['student_id'].unique())
-                    date_str = obs_date.strftime('%Y-%m-%d (%A)')
-                    
-                    # Highlight if it's the currently selected date
-                    if obs_date == observation_date:
-                        st.warning(f"⚠️ **{date_str}** - {students_observed} students (CURRENTLY SELECTED)")
-                    else:
-                        st.info(f"✓ {date_str} - {students_observed} students")
+    class_dates = [obs_date for class_code, obs_date in sessions if class_code == selected_class]
+    if len(class_dates) > 0:
+        unique_dates = sorted(class_dates, reverse=True)[:5]  # Last 5 dates
+        
+        with st.expander("📅 Recent observation dates for this class", expanded=False):
+            st.markdown("**Last 5 observation dates:**")
+            for obs_date in unique_dates:
+                students_observed = len(sessions[(selected_class, obs_date)])
+                date_str = obs_date.strftime('%Y-%m-%d (%A)')
+                
+                # Highlight if it's the currently selected date
+                if obs_date == observation_date:
+                    st.warning(f"⚠️ **{date_str}** - {students_observed} students (CURRENTLY SELECTED)")
+                else:
+                    st.info(f"✓ {date_str} - {students_observed} students")
     
     # Instructions in expandable section
     with st.expander("💡 How to Use Quick Entry", expanded=False):
@@ -268,14 +291,152 @@ def render():
     # Display entry grid with headers
     st.markdown("### Observation Entry Grid")
     
-    # Measure abbreviations for column headers (5 measures - more spacious)
-    measure_abbrev = {
-        "Time on Task": "Time on Task",
-        "Asked/Answered/Shared": "Ask/Ans/Share",
-        "Engaged with Content and Others": "Content & Others",
-        "Materials/Organized": "Materials",
-        "Seeks Teacher Support": "Teacher Support"
+    entry_mode = st.radio(
+        "Entry mode",
+        options=["Grid", "Fields"],
+        horizontal=True,
+        key="entry_mode",
+        help="Grid edits the whole class in one table and sends it to the server only when you save; "
+             "Fields shows a separate input for every measure"
+    )
+    
+    if entry_mode == "Grid":
+        render_grid_entry(class_students, observation_date, selected_class)
+    else:
+        render_field_entry(class_students, observation_date, selected_class)
+    
+    render_pending_update(observation_date, selected_class)
+    
+    # Show count of entries
+    filled_entries = sum(1 for v in st.session_state.entry_grid.values() if v in ['1', '0', '-'])
+    total_possible = len(class_students) * len(utils.ENGAGEMENT_MEASURES)
+    
+    st.markdown(f"**Entries filled:** {filled_entries} / {total_possible}")
+    
+    # Add JavaScript for auto-tab functionality
+    st.markdown("""
+    <script>
+    // Auto-tab after single character entry
+    document.addEventListener('input', function(e) {
+        if (e.target.tagName === 'INPUT' && e.target.type === 'text' && e.target.maxLength === 1) {
+            if (e.target.value.length === 1) {
+                // Find next input field
+                const inputs = Array.from(document.querySelectorAll('input[type="text"]'));
+                const currentIndex = inputs.indexOf(e.target);
+                if (currentIndex >= 0 && currentIndex < inputs.length - 1) {
+                    inputs[currentIndex + 1].focus();
+                    inputs[currentIndex + 1].select();
+                }
+            }
+        }
+    });
+    
+    // Enter key moves down to same column
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter' && e.target.tagName === 'INPUT' && e.target.type === 'text') {
+            e.preventDefault();
+            const inputs = Array.from(document.querySelectorAll('input[type="text"]'));
+            const currentIndex = inputs.indexOf(e.target);
+            
+            // Calculate column position (9 measures per row)
+            const colPosition = currentIndex % 9;
+            const nextRowIndex = currentIndex + 9;
+            
+            if (nextRowIndex < inputs.length) {
+                inputs[nextRowIndex].focus();
+                inputs[nextRowIndex].select();
+            }
+        }
+    });
+    </script>
+    """, unsafe_allow_html=True)
+
+
+def render_grid_entry(class_students, observation_date, selected_class):
+    """
+    Render the entry grid as a single data editor inside a form
+    
+    The whole class x measure matrix is one widget, and inside the form its
+    edits reach the server once, on save, instead of on every keystroke.
+    Saved values go through the same session state as the field entry.
+    """
+    grid = pd.DataFrame(index=pd.Index(class_students['student_id'], name='student_id'))
+    grid['Student'] = class_students['name'].values
+    
+    days_since = [None if pd.isna(days) else int(days) for days in class_students['last_obs_date']]
+    grid['Last Obs'] = ["Never" if days is None else f"{days}d ago" for days in days_since]
+    grid['Status'] = [" ".join(utils.get_status_indicator(days)[:2]) for days in days_since]
+    
+    grid['Absent'] = [
+        st.session_state.attendance_status.get(f"attendance_{student_id}_{observation_date}") == "A"
+        for student_id in grid.index
+    ]
+    for measure in utils.ENGAGEMENT_MEASURES:
+        grid[measure] = [
+            st.session_state.entry_grid.get(f"{student_id}_{measure}_{observation_date}") or None
+            for student_id in grid.index
+        ]
+    
+    column_config = {
+        'Student': st.column_config.TextColumn("Student", width="medium"),
+        'Last Obs': st.column_config.TextColumn("Last Obs", width="small"),
+        'Status': st.column_config.TextColumn("Status", width="small"),
+        'Absent': st.column_config.CheckboxColumn("Absent", help="Absent students get 0 in every measure")
     }
+    for measure in utils.ENGAGEMENT_MEASURES:
+        column_config[measure] = st.column_config.SelectboxColumn(
+            MEASURE_ABBREVIATIONS.get(measure, measure),
+            help=f"{measure}: 1 = observed, 0 = not observed, - = not applicable",
+            options=['1', '0', '-']
+        )
+    
+    # A new key after clearing or loading drops the editor's own pending edits
+    editor_key = f"entry_editor_{selected_class}_{observation_date}_{st.session_state.get('entry_grid_version', 0)}"
+    
+    with st.form(key="observation_grid_form", clear_on_submit=False):
+        edited = st.data_editor(
+            grid,
+            key=editor_key,
+            hide_index=True,
+            use_container_width=True,
+            column_config=column_config,
+            disabled=['Student', 'Last Obs', 'Status']
+        )
+        st.caption("Pick 1, 0 or - in each cell (copy and paste works across cells). "
+                   "Ticking Absent records 0 for every measure.")
+        
+        col1, col2, col3 = st.columns([1, 1, 2])
+        
+        with col1:
+            save_button = st.form_submit_button("💾 Save Observations", type="primary", use_container_width=True)
+        
+        with col2:
+            clear_button = st.form_submit_button("🗑️ Clear Grid", use_container_width=True)
+        
+        if save_button:
+            apply_grid_edits(edited, observation_date)
+            save_observations(observation_date, selected_class, class_students)
+        
+        if clear_button:
+            clear_entry_grid()
+            st.rerun()
+
+
+def apply_grid_edits(edited, observation_date):
+    """Copy the submitted data editor grid into the entry grid and attendance session state"""
+    for student_id, row in edited.iterrows():
+        absent = bool(row['Absent'])
+        st.session_state.attendance_status[f"attendance_{student_id}_{observation_date}"] = "A" if absent else "P"
+        
+        for measure in utils.ENGAGEMENT_MEASURES:
+            # Absence = no engagement, as in the field entry
+            value = "0" if absent else row[measure]
+            key = f"{student_id}_{measure}_{observation_date}"
+            st.session_state.entry_grid[key] = value if value in ['1', '0', '-'] else ""
+
+
+def render_field_entry(class_students, observation_date, selected_class):
+    """Render the entry grid as one input widget per student and measure"""
     
     # Create sticky header with full measure names
     st.markdown("""
@@ -305,7 +466,7 @@ def render():
     header_cols[3].markdown("**Attend.**")
     
     for i, measure in enumerate(utils.ENGAGEMENT_MEASURES):
-        header_cols[4 + i].markdown(f"**{measure_abbrev.get(measure, measure)}**", 
+        header_cols[4 + i].markdown(f"**{MEASURE_ABBREVIATIONS.get(measure, measure)}**", 
                                      help=measure)
     
     st.markdown("---")
@@ -327,7 +488,7 @@ def render():
                 header_cols[3].markdown("**Attend.**")
                 
                 for i, measure in enumerate(utils.ENGAGEMENT_MEASURES):
-                    header_cols[4 + i].markdown(f"**{measure_abbrev.get(measure, measure[:8])}**",
+                    header_cols[4 + i].markdown(f"**{MEASURE_ABBREVIATIONS.get(measure, measure[:8])}**",
                                                  help=measure)
                 st.markdown("---")
             
@@ -428,53 +589,85 @@ def render():
             save_observations(observation_date, selected_class, class_students)
         
         if clear_button:
-            st.session_state.entry_grid = {}
-            st.session_state.attendance_status = {}
+            clear_entry_grid()
             st.rerun()
+
+
+def confirm_pending_update():
+    """Button callback: write the confirmed update before the page reruns"""
+    pending = st.session_state.pop('pending_update', None)
+    if pending is None:
+        return
     
-    # Show count of entries
-    filled_entries = sum(1 for v in st.session_state.entry_grid.values() if v in ['1', '0', '-'])
-    total_possible = len(class_students) * len(utils.ENGAGEMENT_MEASURES)
+    # Upsert only the students being entered in one transaction;
+    # every other student's observations are left untouched
+    if db.upsert_observations(pending['observations'], replace=True):
+        st.session_state.update_result = (
+            'success', f"✅ Updated {len(pending['students'])} student(s). Other data preserved."
+        )
+        
+        # Clear the grid
+        clear_entry_grid()
+
+
+def cancel_pending_update():
+    """Button callback: drop the pending update"""
+    st.session_state.pop('pending_update', None)
+    st.session_state.update_result = ('info', "Save cancelled. No changes made.")
+
+
+def render_pending_update(observation_date, class_code):
+    """
+    Ask to confirm a save that overwrites existing students
+    
+    Rendered after the entry form, since buttons cannot be used inside it.
+    The buttons act in callbacks, so the rerun they trigger already shows
+    the outcome instead of the question.
+    """
+    result, message = st.session_state.pop('update_result', (None, None))
+    if result == 'success':
+        st.success(message)
+        st.balloons()
+    elif result == 'info':
+        st.info(message)
     
-    st.markdown(f"**Entries filled:** {filled_entries} / {total_possible}")
+    pending = st.session_state.get('pending_update')
+    if pending is None:
+        return
     
-    # Add JavaScript for auto-tab functionality
-    st.markdown("""
-    <script>
-    // Auto-tab after single character entry
-    document.addEventListener('input', function(e) {
-        if (e.target.tagName === 'INPUT' && e.target.type === 'text' && e.target.maxLength === 1) {
-            if (e.target.value.length === 1) {
-                // Find next input field
-                const inputs = Array.from(document.querySelectorAll('input[type="text"]'));
-                const currentIndex = inputs.indexOf(e.target);
-                if (currentIndex >= 0 && currentIndex < inputs.length - 1) {
-                    inputs[currentIndex + 1].focus();
-                    inputs[currentIndex + 1].select();
-                }
-            }
-        }
-    });
+    # A pending save only applies to the date and class it was entered for
+    if pending['date'] != observation_date or pending['class_code'] != class_code:
+        del st.session_state.pending_update
+        return
     
-    // Enter key moves down to same column
-    document.addEventListener('keydown', function(e) {
-        if (e.key === 'Enter' && e.target.tagName === 'INPUT' && e.target.type === 'text') {
-            e.preventDefault();
-            const inputs = Array.from(document.querySelectorAll('input[type="text"]'));
-            const currentIndex = inputs.indexOf(e.target);
-            
-            // Calculate column position (9 measures per row)
-            const colPosition = currentIndex % 9;
-            const nextRowIndex = currentIndex + 9;
-            
-            if (nextRowIndex < inputs.length) {
-                inputs[nextRowIndex].focus();
-                inputs[nextRowIndex].select();
-            }
-        }
-    });
-    </script>
-    """, unsafe_allow_html=True)
+    st.error(f"""
+    ### ⚠️ UPDATE WARNING
+    
+    **This will update/overwrite data for:**
+    - {len(pending['students'])} student(s) you entered
+    
+    **Data for {pending['preserved']} other students will be preserved.**
+    
+    **Students affected:** {', '.join(pending['students'])}
+    
+    Are you sure you want to continue?
+    """)
+    
+    # Create confirmation buttons
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col1:
+        st.button("✅ Yes, Update", type="primary", key="confirm_update", on_click=confirm_pending_update)
+    
+    with col2:
+        st.button("❌ Cancel", key="cancel_update", on_click=cancel_pending_update)
+
+
+def clear_entry_grid():
+    """Clear entered values and attendance, including pending data editor edits"""
+    st.session_state.entry_grid = {}
+    st.session_state.attendance_status = {}
+    st.session_state.entry_grid_version = st.session_state.get('entry_grid_version', 0) + 1
 
 
 def save_observations(observation_date, class_code, class_students):
@@ -510,18 +703,16 @@ def save_observations(observation_date, class_code, class_students):
         return
     
     # Check if observations already exist for this date/class
-    existing_obs = db.load_observations()
-    existing_mask = (pd.to_datetime(existing_obs['date']).dt.date == observation_date) & \
-                   (existing_obs['class_code'] == class_code)
+    existing_student_ids = set(
+        db.load_session_index(class_codes=[class_code]).get((class_code, observation_date), frozenset())
+    )
     
-    if existing_mask.any():
+    if existing_student_ids:
         # Check which students from entries already have data
-        existing_student_ids = set(existing_obs[existing_mask]['student_id'].unique())
         students_to_overwrite = students_with_entries.intersection(existing_student_ids)
         students_to_add = students_with_entries - existing_student_ids
         
-        # Count affected records
-        existing_total = existing_mask.sum()
+        # Count affected students
         total_students_in_existing = len(existing_student_ids)
         
         # Determine save mode
@@ -544,80 +735,20 @@ def save_observations(observation_date, class_code, class_students):
             st.success(f"✅ Added {entry_count} observations for {len(students_to_add)} new student(s)")
             
             # Clear the grid
-            st.session_state.entry_grid = {}
-            st.session_state.attendance_status = {}
+            clear_entry_grid()
             st.balloons()
             
         else:
-            # UPDATE/OVERWRITE MODE - modifying existing students
-            st.error(f"""
-            ### ⚠️ UPDATE WARNING
-            
-            **This will update/overwrite data for:**
-            - {len(students_to_overwrite)} student(s) you entered
-            
-            **Data for {total_students_in_existing - len(students_to_overwrite)} other students will be preserved.**
-            
-            **Students affected:** {', '.join(students_to_overwrite)}
-            
-            Are you sure you want to continue?
-            """)
-            
-            # Create confirmation buttons
-            col1, col2, col3 = st.columns([1, 1, 2])
-            
-            with col1:
-                if st.button("✅ Yes, Update", type="primary", key="confirm_update"):
-                    # Delete ONLY the students we're updating
-                    for student_id in students_to_overwrite:
-                        student_mask = existing_mask & (existing_obs['student_id'] == student_id)
-                        # Remove these specific records
-                        observations_to_keep = existing_obs[~student_mask]
-                    
-                    # Delete observations for ONLY the students we're updating
-                    existing_obs_filtered = existing_obs[existing_mask]
-                    students_to_delete_mask = existing_obs_filtered['student_id'].isin(students_to_overwrite)
-                    
-                    if students_to_delete_mask.any():
-                        # This is a workaround - we need to delete by student
-                        for student_id in students_to_overwrite:
-                            # Delete observations for this specific student on this date/class
-                            obs_to_remove = existing_obs[
-                                (pd.to_datetime(existing_obs['date']).dt.date == observation_date) & 
-                                (existing_obs['class_code'] == class_code) &
-                                (existing_obs['student_id'] == student_id)
-                            ]
-                            # Note: This is a limitation - we'd need a delete_student_observations function
-                            # For now, we'll do a full delete and re-add all
-                    
-                    # WORKAROUND: Delete all observations for this date/class, then re-add
-                    # Keep observations we want to preserve
-                    observations_to_keep = existing_obs[~existing_mask].to_dict('records')
-                    observations_to_keep_for_date = existing_obs[
-                        existing_mask & ~existing_obs['student_id'].isin(students_to_overwrite)
-                    ].to_dict('records')
-                    
-                    # Delete all for this date/class
-                    db.delete_observations(observation_date, class_code)
-                    
-                    # Re-add what we want to keep plus new data
-                    all_observations = observations_to_keep_for_date + observations_to_save
-                    db.add_observations(all_observations)
-                    
-                    st.success(f"✅ Updated {len(students_to_overwrite)} student(s). Other data preserved.")
-                    
-                    # Clear the grid
-                    st.session_state.entry_grid = {}
-                    st.session_state.attendance_status = {}
-                    st.balloons()
-            
-            with col2:
-                if st.button("❌ Cancel", key="cancel_update"):
-                    st.info("Save cancelled. No changes made.")
-                    return
-            
-            # Stop here - wait for user to click a button
-            st.stop()
+            # UPDATE/OVERWRITE MODE - modifying existing students. Buttons cannot
+            # be used inside the entry form, so the confirmation is rendered after
+            # it by render_pending_update
+            st.session_state.pending_update = {
+                'date': observation_date,
+                'class_code': class_code,
+                'observations': observations_to_save,
+                'students': sorted(students_to_overwrite),
+                'preserved': total_students_in_existing - len(students_to_overwrite)
+            }
     
     else:
         # No existing data - save directly
@@ -626,6 +757,5 @@ def save_observations(observation_date, class_code, class_students):
         st.success(f"✅ Saved {entry_count} observations for {class_code} on {observation_date}")
         
         # Clear the grid
-        st.session_state.entry_grid = {}
-        st.session_state.attendance_status = {}
+        clear_entry_grid()
         st.balloons()
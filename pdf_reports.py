@@ -10,7 +10,6 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime, timedelta
-import pandas as pd
 import io
 import utils
 import database as db
@@ -29,16 +28,14 @@ def generate_student_report_pdf(student_id, date_range='ALL', start_date=None, e
     Returns:
         BytesIO: PDF file buffer
     """
-    # Load data
+    # Load data (only this student's observations within the date range)
     students_df = db.load_students()
-    observations_df = db.load_observations()
+    start, end = get_date_bounds(date_range, start_date, end_date)
+    observations_df = db.load_observations(student_ids=[student_id], start=start, end=end)
     
     # Get student info
     student = students_df[students_df['student_id'] == student_id].iloc[0]
     
-    # Filter observations by date range
-    observations_df = filter_observations_by_date(observations_df, date_range, start_date, end_date)
-    
     # Filter for this student
     student_obs = observations_df[observations_df['student_id'] == student_id]
     
@@ -212,17 +209,11 @@ def generate_student_report_pdf(student_id, date_range='ALL', start_date=None, e
         elements.append(Spacer(1, 0.15*inch))
         
         # Top Strengths and Focus Areas
-        measure_performance = {}
-        for item in breakdown:
-            if item['Performance %'] is not None and item['Performance %'] != 'N/A':
-                # Get actual numeric value
-                for b_item in breakdown:
-                    if b_item['Measure'] == item['Measure']:
-                        perf, _, _, _, _ = utils.calculate_performance(
-                            student_obs, student_id=student_id, measure=item['Measure']
-                        )
-                        measure_performance[item['Measure']] = perf
-                        break
+        measure_performance = {
+            item['Measure']: item['Performance %']
+            for item in breakdown
+            if item['Performance %'] is not None
+        }
         
         # Two columns for strengths and focus areas
         col_data = []
@@ -290,13 +281,18 @@ def generate_class_report_pdf(class_codes, date_range='ALL', start_date=None, en
     if isinstance(class_codes, str):
         class_codes = [class_codes]
     
-    # Load data
+    # Load data (aggregated counts for the selected rosters within the date range)
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
-    
-    # Filter observations by date range
-    observations_df = filter_observations_by_date(observations_df, date_range, start_date, end_date)
+    roster_ids = students_df.loc[students_df['primary_class'].isin(class_codes), 'student_id']
+    start, end = get_date_bounds(date_range, start_date, end_date)
+    metrics = utils.build_student_metrics(
+        db.load_student_day_counts(student_ids=roster_ids, start=start, end=end),
+        roster_ids
+    )
+    measure_counts = db.load_measure_counts(student_ids=roster_ids, start=start, end=end)
+    measure_counts['measure'] = utils.get_normalized_measures(measure_counts)
+    measure_counts = measure_counts.groupby(['student_id', 'measure'], observed=True)[['ones', 'zeros']].sum()
     
     # Create PDF buffer
     buffer = io.BytesIO()
@@ -368,9 +364,9 @@ def generate_class_report_pdf(class_codes, date_range='ALL', start_date=None, en
         # Get performance summary for all students
         all_summary = []
         for _, student in class_students.iterrows():
-            perf, ones, zeros, absent, valid = utils.calculate_performance(
-                observations_df, student_id=student['student_id']
-            )
+            student_metrics = metrics.loc[student['student_id']]
+            perf = student_metrics['performance']
+            valid = int(student_metrics['valid'])
             if valid > 0:  # Only include students with valid observations
                 all_summary.append({
                     'student_id': student['student_id'],
@@ -412,8 +408,9 @@ def generate_class_report_pdf(class_codes, date_range='ALL', start_date=None, en
         elements.append(Paragraph("ENGAGEMENT PATTERNS & INTERVENTION PRIORITIES", heading_style))
         
         # Calculate engagement insights
-        insights = utils.get_engagement_insights(observations_df, class_students)
-        distribution = utils.get_class_engagement_distribution(observations_df, class_students)
+        engagement = utils.get_engagement_metrics(None, class_students, metrics=metrics)
+        insights = engagement['insights']
+        distribution = engagement['distribution']
         
         engagement_stats_data = [
             ['Avg Effective Engagement:', f"{insights['avg_effective_engagement']:.1f}%", 
@@ -535,11 +532,13 @@ def generate_class_report_pdf(class_codes, date_range='ALL', start_date=None, en
             measure_perfs = []
             students_below = []
             
+            normalized_measure = utils.normalize_measure_name(measure)
             for _, student in class_students.iterrows():
-                perf, _, _, _, valid = utils.calculate_performance(
-                    observations_df, student_id=student['student_id'], measure=measure
-                )
+                key = (student['student_id'], normalized_measure)
+                ones, zeros = measure_counts.loc[key] if key in measure_counts.index else (0, 0)
+                valid = ones + zeros
                 if valid > 0:
+                    perf = (ones / valid) * 100
                     measure_perfs.append(perf)
                     if perf < 75:
                         students_below.append(f"{student['name']} ({perf:.0f}%)")
@@ -581,30 +580,21 @@ def generate_class_report_pdf(class_codes, date_range='ALL', start_date=None, en
     return buffer
 
 
-def filter_observations_by_date(observations_df, date_range, start_date=None, end_date=None):
-    """Filter observations by date range"""
-    if date_range == 'ALL':
-        return observations_df
+def get_date_bounds(date_range, start_date=None, end_date=None):
+    """
+    Translate a report date range option into inclusive bounds for db.load_observations
     
-    elif date_range == 'MOST_RECENT':
+    Returns:
+        tuple: (start, end), either of which may be None for an open bound
+    """
+    if date_range == 'MOST_RECENT':
         # Last 30 days
-        cutoff_date = datetime.now().date() - timedelta(days=30)
-        observations_df = observations_df.copy()
-        observations_df['date'] = pd.to_datetime(observations_df['date'])
-        return observations_df[observations_df['date'].dt.date >= cutoff_date]
+        return datetime.now().date() - timedelta(days=30), None
     
-    elif date_range == 'DATE_RANGE':
-        if start_date and end_date:
-            observations_df = observations_df.copy()
-            observations_df['date'] = pd.to_datetime(observations_df['date'])
-            return observations_df[
-                (observations_df['date'].dt.date >= start_date) &
-                (observations_df['date'].dt.date <= end_date)
-            ]
-        else:
-            return observations_df
+    if date_range == 'DATE_RANGE' and start_date and end_date:
+        return start_date, end_date
     
-    return observations_df
+    return None, None
 
 
 def get_date_range_text(date_range, start_date, end_date):
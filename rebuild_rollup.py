@@ -0,0 +1,40 @@
+"""
+Rebuild the observation daily rollup from raw observations
+Run this to verify the incrementally maintained rollup (or to repair it)
+"""
+
+import database as db
+
+KEYS = ['date', 'class_code', 'student_id']
+VALUES = ['ones', 'zeros', 'not_applicable', 'observation_count', 'absent']
+
+print("Loading current rollup...")
+before = db.load_rollup()
+print(f"Found {len(before)} rollup rows")
+
+print("Rebuilding from observations...")
+rows = db.rebuild_rollup()
+
+if rows is None:
+    print("❌ Rebuild failed - check the database connection")
+else:
+    after = db.load_rollup()
+    
+    # Compare the incrementally maintained rows with the fresh rebuild
+    merged = before.merge(after, on=KEYS, how='outer', suffixes=('_before', '_after'), indicator=True)
+    missing = merged[merged['_merge'] == 'right_only']
+    stale = merged[merged['_merge'] == 'left_only']
+    both = merged[merged['_merge'] == 'both']
+    changed = both[
+        (both[[f"{col}_before" for col in VALUES]].values !=
+         both[[f"{col}_after" for col in VALUES]].values).any(axis=1)
+    ]
+    
+    print(f"✅ Rebuilt {rows} rollup rows")
+    
+    if len(missing) == 0 and len(stale) == 0 and len(changed) == 0:
+        print("Rollup was already consistent with observations")
+    else:
+        print(f"Fixed {len(missing)} missing, {len(stale)} stale and {len(changed)} outdated rows")
+        for _, row in changed.head(10).iterrows():
+            print(f"  {row['date'].date()} {row['class_code']} {row['student_id']}")
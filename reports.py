@@ -17,14 +17,14 @@ def render():
     # Load data
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
+    observation_count = db.count_observations()
     
     # Check if data exists
     if len(students_df) == 0 or len(classes_df) == 0:
         st.warning("⚠️ Please add students and classes in the Setup page first.")
         return
     
-    if len(observations_df) == 0:
+    if observation_count == 0:
         st.info("ℹ️ No observations recorded yet. Reports will be empty.")
     
     # Tabs for different report types
@@ -3,6 +3,7 @@ Setup and Configuration Page
 """
 import streamlit as st
 import pandas as pd
+import io
 import database as db
 import utils
 
@@ -184,22 +185,16 @@ def render_student_roster():
                 st.dataframe(import_df.head(), use_container_width=True)
                 
                 if st.button("✅ Import Students", type="primary"):
-                    success_count = 0
-                    error_count = 0
+                    result = db.bulk_upsert_students(import_df)
                     
-                    for _, row in import_df.iterrows():
-                        success = db.add_student(
-                            row['student_id'],
-                            row['name'],
-                            row['primary_class']
+                    if result:
+                        st.success(
+                            f"✅ Imported {result['inserted']} new students, updated {result['updated']} "
+                            f"({result['rejected']} invalid or duplicate rows skipped)"
                         )
-                        if success:
-                            success_count += 1
-                        else:
-                            error_count += 1
-                    
-                    st.success(f"✅ Imported {success_count} students ({error_count} duplicates skipped)")
-                    st.rerun()
+                        st.rerun()
+                    else:
+                        st.error("❌ Error importing students")
         
         except Exception as e:
             st.error(f"❌ Error reading CSV: {str(e)}")
@@ -331,7 +326,7 @@ def render_data_management():
     
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
+    observation_count = db.count_observations()
     
     col1, col2, col3 = st.columns(3)
     
@@ -356,14 +351,18 @@ def render_data_management():
             )
     
     with col3:
-        if len(observations_df) > 0:
-            csv = observations_df.to_csv(index=False)
-            st.download_button(
-                "📥 Observations",
-                data=csv,
-                file_name="observations.csv",
-                mime="text/csv"
-            )
+        if observation_count > 0:
+            # Streamed from the database and compressed only when requested;
+            # just the gzip output is held for the download
+            if st.button(f"📦 Prepare Observations ({observation_count:,})"):
+                export_buffer = io.BytesIO()
+                if db.export_table_csv_gz('observations', export_buffer) is not None:
+                    st.download_button(
+                        "📥 Observations (.csv.gz)",
+                        data=export_buffer.getvalue(),
+                        file_name="observations.csv.gz",
+                        mime="application/gzip"
+                    )
     
     st.markdown("---")
     
@@ -386,42 +385,71 @@ def render_data_management():
     
     if uploaded_obs is not None:
         try:
-            obs_df = pd.read_csv(uploaded_obs)
+            # Only the first rows are read here; the import itself streams in chunks
+            preview_df = pd.read_csv(uploaded_obs, nrows=10, dtype=str)
+            uploaded_obs.seek(0)
             
             # Validate columns
             required_cols = ['date', 'class_code', 'student_id', 'measure_name', 'value']
-            missing_cols = [col for col in required_cols if col not in obs_df.columns]
+            missing_cols = [col for col in required_cols if col not in preview_df.columns]
             
             if missing_cols:
                 st.error(f"❌ Missing required columns: {', '.join(missing_cols)}")
             else:
-                st.success(f"✅ CSV loaded: {len(obs_df)} observations found")
+                size_mb = uploaded_obs.size / (1024 * 1024)
+                st.success(f"✅ CSV ready: {uploaded_obs.name} ({size_mb:.1f} MB)")
                 
                 # Show preview
-                st.dataframe(obs_df.head(10), use_container_width=True)
+                st.dataframe(preview_df, use_container_width=True)
+                
+                # Resume an interrupted import of the same file (hashed once per upload)
+                hashes = st.session_state.setdefault('import_file_hashes', {})
+                if uploaded_obs.file_id not in hashes:
+                    hashes[uploaded_obs.file_id] = db.file_sha256(uploaded_obs)
+                file_hash = hashes[uploaded_obs.file_id]
+                checkpoint = db.get_import_checkpoint(file_hash)
+                if checkpoint and not checkpoint['completed']:
+                    st.warning(
+                        f"⏸️ A previous import of this file stopped after {checkpoint['rows_done']:,} rows. "
+                        f"Importing will resume from there."
+                    )
+                elif checkpoint:
+                    st.info(
+                        f"ℹ️ This file was already imported ({checkpoint['rows_done']:,} rows). "
+                        f"Importing again will update the existing observations."
+                    )
                 
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     if st.button("✅ Import Observations", type="primary", key="confirm_import_obs"):
-                        # Convert date to proper format
-                        obs_df['date'] = pd.to_datetime(obs_df['date']).dt.strftime('%Y-%m-%d')
+                        progress_bar = st.progress(0.0, text="Starting import...")
                         
-                        # Convert to list of dicts for add_observations
-                        observations_list = obs_df.to_dict('records')
+                        def report_progress(rows_done, fraction):
+                            progress_bar.progress(fraction, text=f"{rows_done:,} rows processed")
                         
-                        # Import
-                        success = db.add_observations(observations_list)
+                        result = db.import_observations_csv(
+                            uploaded_obs,
+                            uploaded_obs.name,
+                            file_hash=file_hash,
+                            progress=report_progress
+                        )
                         
-                        if success:
-                            st.success(f"✅ Imported {len(observations_list)} observations")
+                        if result and result['completed']:
+                            st.success(
+                                f"✅ Imported {result['imported']:,} observations "
+                                f"({result['rejected']:,} invalid rows skipped)"
+                            )
                             st.balloons()
                             st.rerun()
                         else:
-                            st.error("❌ Error importing observations")
+                            st.error("❌ Import stopped. Upload the same file again to resume.")
                 
                 with col2:
-                    st.caption(f"This will add {len(obs_df)} observations to the database")
+                    st.caption(
+                        f"Rows are validated and imported in chunks of {db.IMPORT_CHUNK_ROWS:,}; "
+                        f"rows with unknown students or classes, bad dates or values are skipped"
+                    )
         
         except Exception as e:
             st.error(f"❌ Error reading CSV: {str(e)}")
@@ -18,7 +18,6 @@ def render():
     # Load data
     students_df = db.load_students()
     classes_df = db.load_classes()
-    observations_df = db.load_observations()
     
     # Check if data exists
     if len(students_df) == 0:
@@ -55,6 +54,9 @@ def render():
     if not selected_student_id:
         return
     
+    # Only this student's history is needed below
+    observations_df = db.load_observations(student_ids=[selected_student_id])
+    
     # Get student info
     student = students_df[students_df['student_id'] == selected_student_id].iloc[0]
     
@@ -214,20 +216,8 @@ def render():
         hide_index=True
     )
     
-    # Calculate measure performance dict for insights
-    measure_performance = {}
-    for item in breakdown:
-        if item['Performance %'] != 'N/A':
-            # Extract numeric value
-            perf_val = None
-            for b_item in breakdown:
-                if b_item['Measure'] == item['Measure']:
-                    perf, _, _, _, _ = utils.calculate_performance(
-                        observations_df, student_id=selected_student_id, measure=item['Measure']
-                    )
-                    perf_val = perf
-                    break
-            measure_performance[item['Measure']] = perf_val
+    # Calculate measure performance dict for insights (breakdown keeps numeric values)
+    measure_performance = {item['Measure']: item['Performance %'] for item in breakdown}
     
     st.markdown("---")
     
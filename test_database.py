@@ -0,0 +1,175 @@
+"""
+Observation write paths against a scratch SQLite database: the incrementally
+maintained daily rollup and the keyed upserts
+"""
+
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import event, inspect, text
+
+import database as db
+import utils
+
+
+MEASURES = utils.ENGAGEMENT_MEASURES
+DAY_1 = date(2025, 9, 1)
+DAY_2 = date(2025, 9, 2)
+
+
+def _observations(student_id, values, obs_date=DAY_1, class_code='HIS20A'):
+    return [
+        {'date': obs_date, 'class_code': class_code, 'student_id': student_id,
+         'measure_name': measure, 'value': value}
+        for measure, value in zip(MEASURES, values)
+    ]
+
+
+def _seed():
+    assert db.add_observations(
+        _observations('101', ['1', '1', '0', '-', '1'])
+        + _observations('102', ['0'] * len(MEASURES))
+        + _observations('101', ['1'] * len(MEASURES), obs_date=DAY_2)
+        + _observations('201', ['1', '0', '1', '0', '1'], class_code='SST20')
+    )
+
+
+def assert_rollup_matches_rebuild():
+    maintained = db.load_rollup()
+    assert db.rebuild_rollup() == len(maintained)
+    pd.testing.assert_frame_equal(maintained, db.load_rollup())
+
+
+# ============================================================================
+# ROLLUP
+# ============================================================================
+
+def test_rollup_after_add(roster):
+    _seed()
+    
+    assert_rollup_matches_rebuild()
+    absent = db.load_rollup().set_index(['date', 'class_code', 'student_id'])['absent']
+    assert absent[(pd.Timestamp(DAY_1), 'HIS20A', '102')]
+    assert not absent[(pd.Timestamp(DAY_1), 'HIS20A', '101')]
+
+
+def test_rollup_after_upsert(roster):
+    _seed()
+    assert db.upsert_observations(_observations('102', ['1', '1']) + _observations('103', ['0', '-']))
+    
+    assert_rollup_matches_rebuild()
+
+
+def test_rollup_after_replace(roster):
+    _seed()
+    assert db.upsert_observations(_observations('101', ['0', '0']), replace=True)
+    
+    assert_rollup_matches_rebuild()
+
+
+def test_rollup_after_delete(roster):
+    _seed()
+    assert db.delete_observations(DAY_1, 'HIS20A')
+    
+    assert_rollup_matches_rebuild()
+    rollup = db.load_rollup()
+    assert set(zip(rollup['date'].dt.date, rollup['class_code'])) == {(DAY_2, 'HIS20A'), (DAY_1, 'SST20')}
+
+
+def test_rollup_after_replace_all(roster):
+    _seed()
+    assert db.save_observations(db.load_observations().head(3))
+    
+    assert_rollup_matches_rebuild()
+    assert db.load_rollup()['observation_count'].sum() == 3
+
+
+# ============================================================================
+# KEYED UPSERTS
+# ============================================================================
+
+def _stored():
+    """(date, class_code, student_id, measure_name) -> value for every stored observation"""
+    df = db.load_observations()
+    return {
+        (obs_date.date(), class_code, student_id, measure): value
+        for obs_date, class_code, student_id, measure, value
+        in df[db.OBSERVATION_COLUMNS].itertuples(index=False)
+    }
+
+
+def test_replace_removes_only_omitted_measures_of_entered_students(roster):
+    _seed()
+    before = _stored()
+    
+    assert db.upsert_observations(_observations('101', ['0', '-']), replace=True)
+    
+    after = _stored()
+    entered = {key: value for key, value in after.items() if key[:3] == (DAY_1, 'HIS20A', '101')}
+    assert entered == {(DAY_1, 'HIS20A', '101', MEASURES[0]): '0', (DAY_1, 'HIS20A', '101', MEASURES[1]): '-'}
+    
+    # Other students that day, the same student on other days and other classes are untouched
+    untouched = {key: value for key, value in before.items() if key[:3] != (DAY_1, 'HIS20A', '101')}
+    assert {key: value for key, value in after.items() if key[:3] != (DAY_1, 'HIS20A', '101')} == untouched
+
+
+def test_upsert_without_replace_keeps_other_measures(roster):
+    _seed()
+    before = _stored()
+    
+    assert db.upsert_observations(_observations('101', ['0']))
+    
+    assert _stored() == {**before, (DAY_1, 'HIS20A', '101', MEASURES[0]): '0'}
+
+
+def test_replace_all_keeps_the_keyed_schema(roster):
+    _seed()
+    assert db.save_observations(pd.DataFrame(columns=db.OBSERVATION_COLUMNS))
+    assert db.count_observations() == 0
+    
+    # The upsert needs the unique key index, and initialize_database the id column
+    assert db.upsert_observations(_observations('101', ['1']) * 2)
+    assert db.upsert_observations(_observations('101', ['0']))
+    assert db.initialize_database()
+    assert _stored() == {(DAY_1, 'HIS20A', '101', MEASURES[0]): '0'}
+
+
+# ============================================================================
+# ONE-TIME DEDUPE
+# ============================================================================
+
+def test_initialize_dedupes_once_keeping_the_latest(bare_database):
+    rows = [
+        (DAY_1, 'HIS20A', '101', MEASURES[0], '0'),
+        (DAY_1, 'HIS20A', '101', MEASURES[0], '1'),
+        (DAY_1, 'HIS20A', '101', MEASURES[1], '-'),
+        (DAY_2, 'HIS20A', '101', MEASURES[0], '0'),
+        (DAY_2, 'HIS20A', '101', MEASURES[0], '0'),
+    ]
+    with bare_database.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO observations (date, class_code, student_id, measure_name, value)
+                VALUES (:date, :class_code, :student_id, :measure_name, :value)
+            """),
+            [dict(zip(db.OBSERVATION_COLUMNS, row)) for row in rows]
+        )
+    
+    statements = []
+    event.listen(bare_database, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    
+    assert db.initialize_database()
+    assert any('NOT IN' in statement for statement in statements)
+    assert _stored() == {
+        (DAY_1, 'HIS20A', '101', MEASURES[0]): '1',
+        (DAY_1, 'HIS20A', '101', MEASURES[1]): '-',
+        (DAY_2, 'HIS20A', '101', MEASURES[0]): '0',
+    }
+    assert 'idx_observations_key' in {index['name'] for index in inspect(bare_database).get_indexes('observations')}
+    assert_rollup_matches_rebuild()
+    
+    # Once the unique index exists the full-table DELETE is skipped
+    statements.clear()
+    assert db.initialize_database()
+    assert statements and not any('NOT IN' in statement for statement in statements)
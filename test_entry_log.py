@@ -0,0 +1,99 @@
+"""
+Entry log save flow, run through Streamlit's AppTest against a scratch database
+"""
+
+from datetime import date
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import database as db
+import utils
+
+
+MEASURES = utils.ENGAGEMENT_MEASURES
+
+
+def _entry_page():
+    import entry_log
+    entry_log.render()
+
+
+def _observations(student_id, values, obs_date=None, class_code='HIS20A'):
+    return [
+        {'date': obs_date or date.today(), 'class_code': class_code, 'student_id': student_id,
+         'measure_name': measure, 'value': value}
+        for measure, value in zip(MEASURES, values)
+    ]
+
+
+def _stored(student_id):
+    """Measure -> value saved today for one student"""
+    df = db.load_observations(student_ids=[student_id], start=date.today(), end=date.today())
+    return dict(zip(df['measure_name'], df['value']))
+
+
+@pytest.fixture
+def existing_session(roster):
+    """Today's HIS20A session already holds every measure for students 101 and 102"""
+    assert db.add_observations(_observations('101', ['1'] * len(MEASURES)) + _observations('102', ['1'] * len(MEASURES)))
+
+
+def _submit_field_entry(values):
+    """Enter values for student 101 in Fields mode and press Save"""
+    at = AppTest.from_function(_entry_page, default_timeout=60)
+    at.session_state['entry_mode'] = "Fields"
+    at.run()
+    
+    for measure, value in values.items():
+        at.text_input(key=f"101_{measure}_{date.today()}").input(value)
+    next(button for button in at.button if button.label == "💾 Save Observations").click().run()
+    return at
+
+
+def test_update_confirmation_is_rendered_outside_the_form(existing_session):
+    at = _submit_field_entry({MEASURES[0]: '0', MEASURES[1]: '0'})
+    
+    assert not at.exception
+    assert any("UPDATE WARNING" in error.value for error in at.error)
+    assert at.button(key="confirm_update")
+    assert _stored('101') == {measure: '1' for measure in MEASURES}
+
+
+def test_confirmed_update_replaces_only_the_entered_student(existing_session):
+    at = _submit_field_entry({MEASURES[0]: '0', MEASURES[1]: '0'})
+    at.button(key="confirm_update").click().run()
+    
+    assert not at.exception
+    assert any("Updated 1 student(s)" in success.value for success in at.success)
+    assert _stored('101') == {MEASURES[0]: '0', MEASURES[1]: '0'}
+    assert _stored('102') == {measure: '1' for measure in MEASURES}
+    assert 'pending_update' not in at.session_state
+
+
+def test_cancelled_update_changes_nothing(existing_session):
+    at = _submit_field_entry({MEASURES[0]: '0'})
+    at.button(key="cancel_update").click().run()
+    
+    assert not at.exception
+    assert 'pending_update' not in at.session_state
+    assert not any(button.key == "confirm_update" for button in at.button)
+    assert _stored('101') == {measure: '1' for measure in MEASURES}
+
+
+def test_grid_mode_update_is_confirmed_outside_the_form(existing_session):
+    # Grid is the default mode; the editor starts from the entry grid in session state
+    at = AppTest.from_function(_entry_page, default_timeout=60)
+    at.session_state['entry_grid'] = {f"101_{MEASURES[0]}_{date.today()}": '-'}
+    at.session_state['attendance_status'] = {}
+    at.run()
+    next(button for button in at.button if button.label == "💾 Save Observations").click().run()
+    
+    assert not at.exception
+    assert any("UPDATE WARNING" in error.value for error in at.error)
+    
+    at.button(key="confirm_update").click().run()
+    
+    assert not at.exception
+    assert _stored('101') == {MEASURES[0]: '-'}
+    assert _stored('102') == {measure: '1' for measure in MEASURES}
@@ -0,0 +1,93 @@
+"""
+Parity tests: the *_array engagement helpers must match the scalar functions
+"""
+
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+
+
+# Missing values, the exact 60/70/80 thresholds with neighbours on either side,
+# and pairs differing by exactly +/-15 (the barrier threshold)
+VALUES = [None, np.nan, 0, 45, 55, 59.99, 60, 60.01, 69.99, 70, 70.01,
+          75, 79.99, 80, 80.01, 85, 95, 100]
+PAIRS = list(itertools.product(VALUES, VALUES)) + [
+    (85, 70), (70, 85), (75, 60), (60, 75), (95, 80), (80, 95), (15, 0), (0, 15)
+]
+
+
+def _scalar_input(value):
+    """The scalar functions treat only None as missing; the array versions also accept NaN"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def _scalar_results(function, pairs):
+    return [function(_scalar_input(att), _scalar_input(ach)) for att, ach in pairs]
+
+
+@pytest.fixture(params=['list', 'series'])
+def columns(request):
+    attendance = [att for att, _ in PAIRS]
+    achievement = [ach for _, ach in PAIRS]
+    if request.param == 'series':
+        index = pd.RangeIndex(100, 100 + len(PAIRS))
+        return pd.Series(attendance, index=index, dtype=object), pd.Series(achievement, index=index, dtype=object)
+    return attendance, achievement
+
+
+def test_effective_engagement_matches_scalar(columns):
+    result = utils.calculate_effective_engagement_array(*columns)
+    expected = _scalar_results(utils.calculate_effective_engagement, PAIRS)
+    np.testing.assert_allclose(np.asarray(result, dtype=float), expected)
+
+
+def test_opportunity_lost_matches_scalar(columns):
+    result = utils.calculate_opportunity_lost_array(*columns)
+    expected = _scalar_results(utils.calculate_opportunity_lost, PAIRS)
+    np.testing.assert_allclose(np.asarray(result, dtype=float), expected)
+
+
+def test_primary_barrier_matches_scalar(columns):
+    result = utils.identify_primary_barrier_array(*columns)
+    expected = _scalar_results(utils.identify_primary_barrier, PAIRS)
+    assert list(result) == expected
+
+
+def test_engagement_type_matches_scalar(columns):
+    result = utils.classify_engagement_type_array(*columns)
+    expected = [category for category, _, _, _ in _scalar_results(utils.classify_engagement_type, PAIRS)]
+    assert list(result) == expected
+
+
+def test_series_input_keeps_index(columns):
+    attendance, achievement = columns
+    for function in [utils.calculate_effective_engagement_array, utils.calculate_opportunity_lost_array,
+                     utils.identify_primary_barrier_array, utils.classify_engagement_type_array]:
+        result = function(attendance, achievement)
+        if isinstance(attendance, pd.Series):
+            assert isinstance(result, pd.Series)
+            assert result.index.equals(attendance.index)
+        else:
+            assert isinstance(result, np.ndarray)
+
+
+# A difference of exactly +/-15 is neither "< threshold" nor "> threshold",
+# so the scalar falls through to "Attendance"; the array version must agree
+@pytest.mark.parametrize('attendance, achievement, expected', [
+    (84.99, 70, "Balanced"),
+    (70, 84.99, "Balanced"),
+    (85, 70, "Attendance"),
+    (70, 85, "Attendance"),
+    (85.01, 70, "Engagement"),
+    (70, 85.01, "Attendance"),
+])
+def test_barrier_threshold_boundaries(attendance, achievement, expected):
+    assert utils.identify_primary_barrier(attendance, achievement) == expected
+    assert list(utils.identify_primary_barrier_array([attendance], [achievement])) == [expected]
@@ -1,6 +1,7 @@
 """
 Utility functions for engagement tracking calculations
 """
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -44,6 +45,128 @@ def normalize_measure_name(measure_name):
     """
     return MEASURE_MAPPING.get(measure_name, measure_name)
 
+
+# Column added by the loader holding the normalized measure name
+NORMALIZED_MEASURE_COLUMN = 'normalized_measure'
+
+
+def add_normalized_measure(observations_df):
+    """
+    Add a categorical normalized measure column to an observations DataFrame
+    
+    Done once when observations are loaded so calculations can filter on the
+    normalized name without mapping every row again.
+    
+    Args:
+        observations_df: DataFrame with observations (modified in place)
+    
+    Returns:
+        pd.DataFrame: The same DataFrame with NORMALIZED_MEASURE_COLUMN added
+    """
+    observations_df[NORMALIZED_MEASURE_COLUMN] = get_normalized_measures(observations_df)
+    return observations_df
+
+
+def get_normalized_measures(observations_df):
+    """
+    Get normalized measure names for every observation row
+    
+    Uses the precomputed column when present, otherwise maps measure_name
+    through MEASURE_MAPPING with a vectorized lookup.
+    
+    Args:
+        observations_df: DataFrame with observations
+    
+    Returns:
+        pd.Series: Categorical normalized measure names
+    """
+    if NORMALIZED_MEASURE_COLUMN in observations_df.columns:
+        return observations_df[NORMALIZED_MEASURE_COLUMN]
+    
+    # Map each distinct name once, then broadcast through the factorized codes
+    codes, names = pd.factorize(observations_df['measure_name'])
+    normalized = pd.Index([normalize_measure_name(name) for name in names], dtype=object)
+    categories = normalized.unique()
+    category_codes = categories.get_indexer(normalized)
+    row_codes = np.where(codes < 0, -1, category_codes[codes] if len(category_codes) else codes)
+    
+    return pd.Series(
+        pd.Categorical.from_codes(row_codes, categories=categories),
+        index=observations_df.index
+    )
+
+
+# Integer codes for observation values in compact frames
+VALUE_CODES = {'1': 1, '0': 0, '-': -1}
+
+
+def compact_observations(observations_df):
+    """
+    Convert observations to the compact representation
+    
+    class_code, student_id and measure_name become categoricals and value
+    becomes int8 codes (1, 0, -1 for '-'). All calculation functions in this
+    module accept either representation.
+    
+    Args:
+        observations_df: DataFrame with observations
+    
+    Returns:
+        pd.DataFrame: Compact copy of the observations
+    """
+    compact = observations_df.copy()
+    if 'date' in compact.columns:
+        compact['date'] = pd.to_datetime(compact['date'])
+    for column in ['class_code', 'student_id', 'measure_name']:
+        if column in compact.columns:
+            compact[column] = compact[column].astype('category')
+    if 'value' in compact.columns:
+        # Anything other than 1/0/- (should not happen) becomes -2 so it is never counted
+        compact['value'] = compact['value'].map(VALUE_CODES).fillna(-2).astype('int8')
+    return compact
+
+
+def clean_observation_chunk(chunk, valid_students, valid_classes):
+    """
+    Normalize and validate one chunk of imported observation rows
+    
+    Strips whitespace, parses dates, and keeps only rows with a parseable
+    date, a value of 1/0/-, a non-empty measure and a known student and
+    class. Measure names are stored as written: several legacy names can map
+    to one measure, so mapping them here would collapse distinct rows onto
+    one key. Readers normalize them with get_normalized_measures.
+    
+    Args:
+        chunk: DataFrame read as strings with the observation columns
+        valid_students: Set of existing student IDs
+        valid_classes: Set of existing class codes
+    
+    Returns:
+        tuple: (clean DataFrame, number of rejected rows)
+    """
+    df = chunk[['date', 'class_code', 'student_id', 'measure_name', 'value']].copy()
+    for column in df.columns:
+        df[column] = df[column].astype(str).str.strip()
+    
+    dates = pd.to_datetime(df['date'], errors='coerce', format='mixed')
+    df['date'] = dates.dt.date
+    
+    valid = (
+        dates.notna()
+        & df['value'].isin(list(VALUE_CODES))
+        & (df['measure_name'] != '')
+        & df['student_id'].isin(valid_students)
+        & df['class_code'].isin(valid_classes)
+    )
+    return df[valid], int((~valid).sum())
+
+
+def _value_key(values, value):
+    """Return an observation value ('1', '0' or '-') in the representation used by values"""
+    if pd.api.types.is_integer_dtype(values):
+        return VALUE_CODES[value]
+    return value
+
 # Performance Band Criteria
 PERFORMANCE_BANDS = [
     (85, 100, "Exemplary", "#00B050"),
@@ -84,23 +207,29 @@ def calculate_performance(observations_df, student_id=None, measure=None):
     Returns:
         tuple: (percentage, ones_count, zeros_count, not_applicable_count, valid_count)
     """
-    df = observations_df.copy()
+    # Build one row mask instead of copying and re-slicing the frame
+    mask = None
     
     if student_id is not None:
-        df = df[df['student_id'] == student_id]
+        mask = observations_df['student_id'] == student_id
     
     if measure is not None:
         # Normalize measure name for backward compatibility
         normalized_measure = normalize_measure_name(measure)
         # Get all observations that map to this measure
-        df = df[df['measure_name'].apply(normalize_measure_name) == normalized_measure]
+        measure_mask = get_normalized_measures(observations_df) == normalized_measure
+        mask = measure_mask if mask is None else mask & measure_mask
+    
+    values = observations_df['value'] if mask is None else observations_df['value'][mask]
     
-    if len(df) == 0:
+    if len(values) == 0:
         return None, 0, 0, 0, 0
     
-    ones = len(df[df['value'] == '1'])
-    zeros = len(df[df['value'] == '0'])  # Now includes absences
-    not_applicable = len(df[df['value'] == '-'])  # Only for "didn't apply"
+    # Count 1s, 0s and dashes in a single pass
+    counts = values.value_counts()
+    ones = int(counts.get(_value_key(values, '1'), 0))
+    zeros = int(counts.get(_value_key(values, '0'), 0))  # Now includes absences
+    not_applicable = int(counts.get(_value_key(values, '-'), 0))  # Only for "didn't apply"
     valid = ones + zeros  # Zeros now count (absences are zeros)
     
     if valid == 0:
@@ -258,6 +387,21 @@ def get_days_since_last_observation(observations_df, student_id):
     return days
 
 
+def get_days_since(last_dates):
+    """
+    Calculate days since each date in one vectorized step
+    
+    Args:
+        last_dates: Series of last observation dates (NaT if never observed),
+            e.g. from database.load_last_observed
+    
+    Returns:
+        pd.Series: Days since each date (NaN where there is no date)
+    """
+    today = pd.Timestamp(datetime.now().date())
+    return (today - pd.to_datetime(last_dates).dt.normalize()).dt.days
+
+
 def format_percentage(percentage):
     """Format percentage for display"""
     if percentage is None:
@@ -290,12 +434,25 @@ def get_student_measure_breakdown(observations_df, student_id):
     Returns:
         list: List of dicts with measure statistics
     """
+    student_obs = observations_df[observations_df['student_id'] == student_id]
+    
+    # Count 1/0/- for every normalized measure in one grouped pass
+    values = student_obs['value']
+    counts = pd.DataFrame({
+        'ones': (values == _value_key(values, '1')).astype(int),
+        'zeros': (values == _value_key(values, '0')).astype(int),
+        'not_applicable': (values == _value_key(values, '-')).astype(int)
+    }).groupby(get_normalized_measures(student_obs).astype(object)).sum()
+    
     breakdown = []
     
     for measure in ENGAGEMENT_MEASURES:
-        perf, ones, zeros, not_applicable, valid = calculate_performance(
-            observations_df, student_id=student_id, measure=measure
-        )
+        if measure in counts.index:
+            ones, zeros, not_applicable = (int(count) for count in counts.loc[measure])
+        else:
+            ones, zeros, not_applicable = 0, 0, 0
+        valid = ones + zeros
+        perf = (ones / valid) * 100 if valid > 0 else None
         
         # Total observations for this measure
         total = ones + zeros + not_applicable
@@ -330,20 +487,30 @@ def get_days_absent(observations_df, student_id):
     Returns:
         int: Number of unique dates where student was absent
     """
-    student_obs = observations_df[observations_df['student_id'] == student_id]
+    return int(get_absent_days(observations_df, student_id).sum())
+
+
+def get_absent_days(observations_df, student_id=None):
+    """
+    Flag absent days for one student or the whole observations table
     
-    if len(student_obs) == 0:
-        return 0
+    A day is absent if ALL observations for that student on that date are '0'.
     
-    # Group by date and check if ALL observations are 0 (indicating absence)
-    absent_days = 0
-    for date in student_obs['date'].unique():
-        date_obs = student_obs[student_obs['date'] == date]
-        # If all values for this date are '0', student was absent
-        if all(date_obs['value'] == '0'):
-            absent_days += 1
+    Args:
+        observations_df: DataFrame with observations
+        student_id: Optional student ID (all students if None)
     
-    return absent_days
+    Returns:
+        pd.Series: Boolean absent flag indexed by (student_id, date)
+    """
+    if student_id is not None:
+        observations_df = observations_df[observations_df['student_id'] == student_id]
+    
+    values = observations_df['value']
+    is_zero = values == _value_key(values, '0')
+    return is_zero.groupby(
+        [observations_df['student_id'], observations_df['date']], sort=False, dropna=False, observed=True
+    ).all()
 
 
 def get_total_observation_days(observations_df, student_id):
@@ -387,14 +554,111 @@ def calculate_attendance_rate(observations_df, student_id):
     return (present_days / total_days) * 100
 
 
-def get_class_performance_summary(observations_df, students_df, class_code):
+def get_student_metrics(observations_df, student_ids=None):
+    """
+    Calculate performance and attendance metrics for many students in one pass
+
+    Groups observations once by (student_id, date) instead of re-filtering the
+    whole table per student. Values match calculate_performance,
+    get_total_observation_days, get_days_absent, calculate_attendance_rate and
+    get_days_since_last_observation.
+
+    Args:
+        observations_df: DataFrame with observations
+        student_ids: Optional list of student IDs (students without observations
+            are included with zero counts)
+
+    Returns:
+        pd.DataFrame: Indexed by student_id with columns [ones, zeros,
+            not_applicable, valid, performance, total_days, days_absent,
+            days_present, attendance_rate, last_date, days_since_last]
+    """
+    obs = observations_df
+    if student_ids is not None:
+        student_ids = pd.Index(student_ids).unique()
+        obs = obs[obs['student_id'].isin(student_ids)]
+    
+    values = obs['value']
+    flags = pd.DataFrame({
+        'student_id': obs['student_id'],
+        'date': pd.to_datetime(obs['date']),
+        'ones': (values == _value_key(values, '1')).astype(int),
+        'zeros': (values == _value_key(values, '0')).astype(int),
+        'not_applicable': (values == _value_key(values, '-')).astype(int)
+    })
+    
+    # One row per student per observation day
+    daily = flags.groupby(['student_id', 'date'], sort=False, dropna=False, observed=True).agg(
+        ones=('ones', 'sum'),
+        zeros=('zeros', 'sum'),
+        not_applicable=('not_applicable', 'sum'),
+        rows=('ones', 'size')
+    ).reset_index()
+    # A day is absent if ALL observations for that day are '0'
+    daily['absent'] = (daily['zeros'] == daily['rows']).astype(int)
+    
+    counts = daily.groupby('student_id', sort=False, observed=True).agg(
+        ones=('ones', 'sum'),
+        zeros=('zeros', 'sum'),
+        not_applicable=('not_applicable', 'sum'),
+        total_days=('date', 'size'),
+        days_absent=('absent', 'sum'),
+        last_date=('date', 'max')
+    )
+    
+    return build_student_metrics(counts, student_ids)
+
+
+def build_student_metrics(counts_df, student_ids=None):
+    """
+    Derive per-student metrics from per-student counts
+    
+    Shared by get_student_metrics and the SQL aggregates from
+    database.load_student_day_counts, so both give identical results.
+    
+    Args:
+        counts_df: DataFrame indexed by student_id with columns [ones, zeros,
+            not_applicable, total_days, days_absent, last_date]
+        student_ids: Optional list of student IDs (students without counts
+            are included with zeros)
+    
+    Returns:
+        pd.DataFrame: Same layout as get_student_metrics
+    """
+    metrics = counts_df.copy()
+    # Plain index so lookups by student ID work for categorical input too
+    metrics.index = metrics.index.astype(object)
+    metrics['last_date'] = pd.to_datetime(metrics['last_date'])
+    
+    count_columns = ['ones', 'zeros', 'not_applicable', 'total_days', 'days_absent']
+    if student_ids is not None:
+        metrics = metrics.reindex(pd.Index(student_ids).unique())
+        metrics[count_columns] = metrics[count_columns].fillna(0)
+    
+    metrics[count_columns] = metrics[count_columns].astype(int)
+    metrics['valid'] = metrics['ones'] + metrics['zeros']
+    metrics['performance'] = (metrics['ones'] / metrics['valid'] * 100).where(metrics['valid'] > 0)
+    metrics['days_present'] = metrics['total_days'] - metrics['days_absent']
+    metrics['attendance_rate'] = (
+        metrics['days_present'] / metrics['total_days'] * 100
+    ).where(metrics['total_days'] > 0)
+    
+    metrics['days_since_last'] = get_days_since(metrics['last_date'])
+    metrics.index.name = 'student_id'
+    
+    return metrics
+
+
+def get_class_performance_summary(observations_df, students_df, class_code, metrics=None):
     """
     Get performance summary for all students in a class
     
     Args:
-        observations_df: DataFrame with observations
+        observations_df: DataFrame with observations (unused when metrics is given)
         students_df: DataFrame with student roster
         class_code: Class code to filter
+        metrics: Optional precomputed get_student_metrics() or
+            build_student_metrics() result covering the class roster
     
     Returns:
         list: List of dicts with student statistics
@@ -402,18 +666,24 @@ def get_class_performance_summary(observations_df, students_df, class_code):
     class_students = students_df[students_df['primary_class'] == class_code]
     summary = []
     
+    # All per-student numbers come from a single grouped pass
+    if metrics is None:
+        metrics = get_student_metrics(observations_df, class_students['student_id'])
+    
     for _, student in class_students.iterrows():
-        perf, ones, zeros, absent, valid = calculate_performance(
-            observations_df, student_id=student['student_id']
-        )
+        student_metrics = metrics.loc[student['student_id']]
+        ones = int(student_metrics['ones'])
+        zeros = int(student_metrics['zeros'])
+        valid = int(student_metrics['valid'])
+        perf = student_metrics['performance'] if pd.notna(student_metrics['performance']) else None
         
         # Calculate attendance
-        attendance_rate = calculate_attendance_rate(observations_df, student['student_id'])
-        total_days = get_total_observation_days(observations_df, student['student_id'])
-        days_absent = get_days_absent(observations_df, student['student_id'])
+        attendance_rate = student_metrics['attendance_rate'] if pd.notna(student_metrics['attendance_rate']) else None
+        total_days = int(student_metrics['total_days'])
+        days_absent = int(student_metrics['days_absent'])
         days_present = total_days - days_absent
         
-        days_since = get_days_since_last_observation(observations_df, student['student_id'])
+        days_since = int(student_metrics['days_since_last']) if pd.notna(student_metrics['days_since_last']) else None
         status_emoji, status_label, _ = get_status_indicator(days_since)
         
         # Determine status
@@ -689,134 +959,288 @@ def calculate_opportunity_lost(attendance_pct, achievement_pct):
     return max(0.0, lost)  # Can't be negative
 
 
-def get_engagement_correlation(observations_df, students_df):
+def _to_float_array(values):
+    """Convert a column of percentages (None allowed) to a float array with NaN for missing"""
+    return np.asarray(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'), dtype=float)
+
+
+def _match_input(result, template):
+    """Return result as a Series aligned to template if it is a Series, else as an array"""
+    if isinstance(template, pd.Series):
+        return pd.Series(result, index=template.index)
+    return result
+
+
+def calculate_effective_engagement_array(attendance, achievement):
     """
-    Calculate correlation between attendance and achievement for a class
+    Vectorized calculate_effective_engagement for whole columns
     
     Args:
-        observations_df: DataFrame with observations
-        students_df: DataFrame with students
+        attendance: Array-like of attendance percentages (None/NaN for missing)
+        achievement: Array-like of achievement percentages (None/NaN for missing)
     
     Returns:
-        float: Correlation coefficient (-1 to 1)
+        np.ndarray or pd.Series: Effective Engagement Scores (0.0 where data is missing)
     """
-    if len(observations_df) == 0 or len(students_df) == 0:
-        return 0.0
+    att = _to_float_array(attendance)
+    ach = _to_float_array(achievement)
+    has_both = ~np.isnan(att) & ~np.isnan(ach)
     
-    student_metrics = []
+    result = np.where(has_both, (att * ach) / 100, 0.0)
+    return _match_input(result, attendance)
+
+
+def calculate_opportunity_lost_array(attendance, achievement):
+    """
+    Vectorized calculate_opportunity_lost for whole columns
     
-    for _, student in students_df.iterrows():
-        student_obs = observations_df[observations_df['student_id'] == student['student_id']]
-        
-        if len(student_obs) == 0:
-            continue
-        
-        attendance_pct = calculate_attendance_rate(observations_df, student['student_id'])
-        achievement_pct = calculate_performance(observations_df, student_id=student['student_id'])[0]
-        
-        if attendance_pct is not None and achievement_pct is not None:
-            student_metrics.append({
-                'attendance': attendance_pct,
-                'achievement': achievement_pct
-            })
+    Args:
+        attendance: Array-like of attendance percentages (None/NaN for missing)
+        achievement: Array-like of achievement percentages (None/NaN for missing)
     
-    if len(student_metrics) < 2:
-        return 0.0
+    Returns:
+        np.ndarray or pd.Series: Percentage of potential engagement lost to absence
+    """
+    att = _to_float_array(attendance)
+    ach = _to_float_array(achievement)
+    has_both = ~np.isnan(att) & ~np.isnan(ach)
+    
+    lost = np.maximum(ach - (att * ach) / 100, 0.0)
+    result = np.where(has_both, lost, 0.0)
+    return _match_input(result, attendance)
+
+
+def identify_primary_barrier_array(attendance, achievement, threshold=15):
+    """
+    Vectorized identify_primary_barrier for whole columns
     
-    metrics_df = pd.DataFrame(student_metrics)
-    correlation = metrics_df['attendance'].corr(metrics_df['achievement'])
+    Args:
+        attendance: Array-like of attendance percentages (None/NaN for missing)
+        achievement: Array-like of achievement percentages (None/NaN for missing)
+        threshold: Percentage difference threshold (default 15)
     
-    return correlation if not pd.isna(correlation) else 0.0
+    Returns:
+        np.ndarray or pd.Series: "Attendance", "Engagement", "Balanced" or "Unknown"
+    """
+    att = _to_float_array(attendance)
+    ach = _to_float_array(achievement)
+    missing = np.isnan(att) | np.isnan(ach)
+    diff = att - ach
+    
+    result = np.select(
+        [missing, np.abs(diff) < threshold, diff > threshold],
+        ["Unknown", "Balanced", "Engagement"],
+        default="Attendance"
+    ).astype(object)
+    return _match_input(result, attendance)
 
 
-def get_class_engagement_distribution(observations_df, students_df):
+def classify_engagement_type_array(attendance, achievement):
     """
-    Get distribution of students across engagement type categories
+    Vectorized classify_engagement_type for whole columns
+    
+    Returns only the category; emoji, description and intervention for a
+    category can be looked up with classify_engagement_type.
+    
+    Args:
+        attendance: Array-like of attendance percentages (None/NaN for missing)
+        achievement: Array-like of achievement percentages (None/NaN for missing)
+    
+    Returns:
+        np.ndarray or pd.Series: Engagement type category per student
+    """
+    att = _to_float_array(attendance)
+    ach = _to_float_array(achievement)
+    missing = np.isnan(att) | np.isnan(ach)
+    
+    # Same thresholds as classify_engagement_type
+    high_attendance = att >= 80
+    low_attendance = att < 70
+    high_achievement = ach >= 70
+    low_achievement = ach < 60
+    
+    result = np.select(
+        [
+            missing,
+            high_attendance & high_achievement,
+            high_attendance & low_achievement,
+            low_attendance & high_achievement,
+            low_attendance & low_achievement,
+            att >= ach
+        ],
+        [
+            "Unknown",
+            "Exemplary",
+            "Present but Disengaged",
+            "Engaged but Absent",
+            "Critical Intervention Needed",
+            "Developing - Focus Engagement"
+        ],
+        default="Developing - Focus Attendance"
+    ).astype(object)
+    return _match_input(result, attendance)
+
+
+ENGAGEMENT_CATEGORIES = [
+    "Exemplary",
+    "Present but Disengaged",
+    "Engaged but Absent",
+    "Critical Intervention Needed",
+    "Developing - Focus Engagement",
+    "Developing - Focus Attendance",
+    "Unknown"
+]
+
+
+def get_student_engagement_table(observations_df, students_df, metrics=None):
+    """
+    Build a per-student attendance/achievement table with engagement metrics
     
     Args:
         observations_df: DataFrame with observations
         students_df: DataFrame with students
+        metrics: Optional precomputed get_student_metrics() result
     
     Returns:
-        dict: Count of students in each category
+        pd.DataFrame: One row per student in students_df with columns
+            [student_id, attendance, achievement, effective_engagement,
+             opportunity_lost, primary_barrier, category]
     """
-    distribution = {
-        "Exemplary": 0,
-        "Present but Disengaged": 0,
-        "Engaged but Absent": 0,
-        "Critical Intervention Needed": 0,
-        "Developing - Focus Engagement": 0,
-        "Developing - Focus Attendance": 0,
-        "Unknown": 0
-    }
+    if metrics is None:
+        metrics = get_student_metrics(observations_df, students_df['student_id'])
     
-    for _, student in students_df.iterrows():
-        attendance_pct = calculate_attendance_rate(observations_df, student['student_id'])
-        achievement_pct = calculate_performance(observations_df, student_id=student['student_id'])[0]
-        
-        category, _, _, _ = classify_engagement_type(attendance_pct, achievement_pct)
-        distribution[category] += 1
+    student_metrics = metrics.reindex(students_df['student_id'])
+    table = pd.DataFrame({
+        'student_id': students_df['student_id'].values,
+        'attendance': student_metrics['attendance_rate'].values,
+        'achievement': student_metrics['performance'].values
+    })
+    
+    attendance = table['attendance']
+    achievement = table['achievement']
+    
+    table['effective_engagement'] = calculate_effective_engagement_array(attendance, achievement)
+    table['opportunity_lost'] = calculate_opportunity_lost_array(attendance, achievement)
+    table['primary_barrier'] = identify_primary_barrier_array(attendance, achievement)
+    table['category'] = classify_engagement_type_array(attendance, achievement)
     
-    return distribution
+    return table
 
 
-def get_engagement_insights(observations_df, students_df):
+def get_engagement_metrics(observations_df, students_df, metrics=None):
     """
-    Generate insights about engagement patterns in the class
+    Calculate all class engagement metrics from one per-student table
+    
+    Combines the results of get_engagement_insights,
+    get_class_engagement_distribution and get_engagement_correlation
+    without recomputing attendance and achievement for each of them.
     
     Args:
-        observations_df: DataFrame with observations
+        observations_df: DataFrame with observations (may be None when metrics is given)
         students_df: DataFrame with students
+        metrics: Optional precomputed get_student_metrics() or
+            build_student_metrics() result
     
     Returns:
-        dict: Various engagement insights
+        dict: {'insights': dict, 'distribution': dict, 'correlation': float,
+               'table': pd.DataFrame}
     """
-    if len(observations_df) == 0 or len(students_df) == 0:
+    table = get_student_engagement_table(observations_df, students_df, metrics=metrics)
+    
+    distribution = {category: 0 for category in ENGAGEMENT_CATEGORIES}
+    for category, count in table['category'].value_counts().items():
+        distribution[category] += int(count)
+    
+    if observations_df is not None:
+        has_observations = len(observations_df) > 0
+    else:
+        has_observations = int(metrics['total_days'].sum()) > 0
+    
+    if not has_observations or len(students_df) == 0:
         return {
-            'avg_effective_engagement': 0,
-            'correlation': 0,
-            'present_but_disengaged_count': 0,
-            'engaged_but_absent_count': 0,
-            'opportunity_lost_avg': 0,
-            'primary_barrier_counts': {'Attendance': 0, 'Engagement': 0, 'Balanced': 0}
+            'insights': {
+                'avg_effective_engagement': 0,
+                'correlation': 0,
+                'present_but_disengaged_count': 0,
+                'engaged_but_absent_count': 0,
+                'opportunity_lost_avg': 0,
+                'primary_barrier_counts': {'Attendance': 0, 'Engagement': 0, 'Balanced': 0}
+            },
+            'distribution': distribution,
+            'correlation': 0.0,
+            'table': table
         }
     
-    effective_engagements = []
-    opportunities_lost = []
-    primary_barriers = {'Attendance': 0, 'Engagement': 0, 'Balanced': 0, 'Unknown': 0}
-    present_disengaged = 0
-    engaged_absent = 0
+    # Students with both attendance and achievement data
+    scored = table[table['attendance'].notna() & table['achievement'].notna()]
     
-    for _, student in students_df.iterrows():
-        attendance_pct = calculate_attendance_rate(observations_df, student['student_id'])
-        achievement_pct = calculate_performance(observations_df, student_id=student['student_id'])[0]
-        
-        if attendance_pct is not None and achievement_pct is not None:
-            # Effective engagement
-            ees = calculate_effective_engagement(attendance_pct, achievement_pct)
-            effective_engagements.append(ees)
-            
-            # Opportunity lost
-            lost = calculate_opportunity_lost(attendance_pct, achievement_pct)
-            opportunities_lost.append(lost)
-            
-            # Primary barrier
-            barrier = identify_primary_barrier(attendance_pct, achievement_pct)
-            primary_barriers[barrier] += 1
-            
-            # Count specific patterns
-            category, _, _, _ = classify_engagement_type(attendance_pct, achievement_pct)
-            if category == "Present but Disengaged":
-                present_disengaged += 1
-            elif category == "Engaged but Absent":
-                engaged_absent += 1
+    if len(scored) < 2:
+        correlation = 0.0
+    else:
+        correlation = scored['attendance'].corr(scored['achievement'])
+        correlation = correlation if not pd.isna(correlation) else 0.0
     
-    return {
+    effective_engagements = scored['effective_engagement'].tolist()
+    opportunities_lost = scored['opportunity_lost'].tolist()
+    
+    primary_barriers = {'Attendance': 0, 'Engagement': 0, 'Balanced': 0, 'Unknown': 0}
+    for barrier, count in scored['primary_barrier'].value_counts().items():
+        primary_barriers[barrier] += int(count)
+    
+    insights = {
         'avg_effective_engagement': sum(effective_engagements) / len(effective_engagements) if effective_engagements else 0,
-        'correlation': get_engagement_correlation(observations_df, students_df),
-        'present_but_disengaged_count': present_disengaged,
-        'engaged_but_absent_count': engaged_absent,
+        'correlation': correlation,
+        'present_but_disengaged_count': int((scored['category'] == "Present but Disengaged").sum()),
+        'engaged_but_absent_count': int((scored['category'] == "Engaged but Absent").sum()),
         'opportunity_lost_avg': sum(opportunities_lost) / len(opportunities_lost) if opportunities_lost else 0,
         'primary_barrier_counts': primary_barriers
     }
+    
+    return {
+        'insights': insights,
+        'distribution': distribution,
+        'correlation': correlation,
+        'table': table
+    }
+
+
+def get_engagement_correlation(observations_df, students_df):
+    """
+    Calculate correlation between attendance and achievement for a class
+    
+    Args:
+        observations_df: DataFrame with observations
+        students_df: DataFrame with students
+    
+    Returns:
+        float: Correlation coefficient (-1 to 1)
+    """
+    return get_engagement_metrics(observations_df, students_df)['correlation']
 
+
+def get_class_engagement_distribution(observations_df, students_df):
+    """
+    Get distribution of students across engagement type categories
+    
+    Args:
+        observations_df: DataFrame with observations
+        students_df: DataFrame with students
+    
+    Returns:
+        dict: Count of students in each category
+    """
+    return get_engagement_metrics(observations_df, students_df)['distribution']
+
+
+def get_engagement_insights(observations_df, students_df):
+    """
+    Generate insights about engagement patterns in the class
+    
+    Args:
+        observations_df: DataFrame with observations
+        students_df: DataFrame with students
+    
+    Returns:
+        dict: Various engagement insights
+    """
+    return get_engagement_metrics(observations_df, students_df)['insights']